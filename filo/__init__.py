@@ -1,18 +1,25 @@
 """File Management."""
 
 from .misc import list_files, list_all, move_files, move_all
-from .misc import batch_file_rename, make_iterable
+from .misc import batch_file_rename, make_iterable, scan_files, scan_tree
+from .misc import bulk_move, undo_moves, iter_files, natural_key
 
 from .fileio import load_json, to_json
 from .fileio import load_csv, data_to_line, line_to_data
+from .fileio import load_npz, iter_csv, load_csv_array, TabularWriter
+from .fileio import LineIndex
 
 from .file_series import File, FileSeries
+from .catalog import FileCatalog
+from .time_sources import TimeSourceBase, MtimeSource, MetadataTimeSource
+from .time_sources import SidecarTimeSource, FilenameTimeSource
 from .data_series import DataSeries
 
 from .viewers import KeyPressSlider, DataViewerBase, AnalysisViewerBase
 from .viewers import FormattedAnalysisViewerBase
 
 from .readers import DataSeriesReaderBase
+from .cache import MemoryCache, SharedMemoryCache
 from .resample import create_bins_centered_on, resample_dataframe
 
 from .parameters import ParameterBase, TransformParameterBase, CorrectionParameterBase
@@ -0,0 +1,696 @@
+"""Memory-limited caching of data read from data series."""
+
+# Standard library
+import os
+import re
+import sys
+import math
+import time
+import uuid
+import weakref
+import threading
+import multiprocessing
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait
+
+# Non-standard
+import numpy as np
+
+
+CacheInfo = namedtuple(
+    'CacheInfo',
+    ('hits', 'misses', 'maxsize', 'currsize', 'nbytes', 'max_bytes'),
+)
+
+
+class MemoryCache:
+    """Least-recently-used cache limited by the memory size of its entries.
+
+    Contrary to functools.lru_cache, which limits the number of entries, the
+    limit is a number of bytes, measured with the nbytes attribute of entries
+    (numpy arrays) or with sys.getsizeof(). Several functions can be cached
+    in the same cache (see wrap()), which then share the same memory budget.
+
+    Optionally, entries are also evicted when the available memory of the
+    system (read from /proc/meminfo, Linux only) falls below some limit, or
+    when there are too many entries (max_entries).
+
+    Examples
+    --------
+    >>> cache = MemoryCache(max_bytes='2GB')
+    >>> read = cache.wrap(read)  # read.cache_info(), read.cache_clear()
+    """
+
+    def __init__(self, max_bytes, min_available=None, max_entries=None):
+        """Init cache.
+
+        Parameters
+        ----------
+        max_bytes : int or str
+            maximum total size of entries, in bytes or as a str with units,
+            e.g. '2GB', '500 MiB'; None for no limit.
+
+        min_available : int or str, optional
+            if not None, evict entries when the memory available on the
+            system is below this value (same format as max_bytes).
+
+        max_entries : int, optional
+            if not None, maximum number of entries.
+        """
+        self.max_bytes = None if max_bytes is None else parse_bytes(max_bytes)
+        self.max_entries = max_entries
+        self.min_available = None if min_available is None else parse_bytes(min_available)
+        self.nbytes = 0
+        self._entries = OrderedDict()  # {(namespace, key): (value, nbytes)}
+        self._lock = threading.RLock()
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}, {len(self._entries)} entries, "
+            f"{self.nbytes}/{self.max_bytes} bytes"
+        )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __getstate__(self):
+        # Entries and locks are not transferred e.g. to other processes
+        state = self.__dict__.copy()
+        state['nbytes'] = 0
+        state['_entries'] = OrderedDict()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    # ============================ Public methods ============================
+
+    def get(self, namespace, key, default=None):
+        """Get entry and mark it as most recently used."""
+        with self._lock:
+            try:
+                value, _ = self._entries[namespace, key]
+            except KeyError:
+                return default
+            self._entries.move_to_end((namespace, key))
+            return value
+
+    def put(self, namespace, key, value):
+        """Add entry, evicting least recently used entries if necessary.
+
+        Entries larger than the cache limit are not stored.
+        """
+        nbytes = get_nbytes(value)
+        with self._lock:
+            self._pop(namespace, key)
+            max_bytes = math.inf if self.max_bytes is None else self.max_bytes
+            budget = max_bytes - nbytes
+            deficit = self._memory_deficit()
+            if deficit:
+                budget = min(budget, self.nbytes - deficit - nbytes)
+            if budget < 0:  # would not fit even in empty cache: keep entries
+                return
+            self._evict(budget, reserved_entries=1)
+            self._entries[namespace, key] = value, nbytes
+            self.nbytes += nbytes
+
+    def clear(self, namespace=None):
+        """Remove all entries (of a specific namespace if not None)."""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self.nbytes = 0
+                return
+            for namespace_, key in list(self._entries):
+                if namespace_ == namespace:
+                    self._pop(namespace_, key)
+
+    def wrap(self, function, namespace=None):
+        """Cache function in this cache (see CachedFunction)."""
+        namespace = function.__name__ if namespace is None else namespace
+        return CachedFunction(function, cache=self, namespace=namespace)
+
+    # ------------------------------ Internals -------------------------------
+
+    def _pop(self, namespace, key):
+        try:
+            _, nbytes = self._entries.pop((namespace, key))
+        except KeyError:
+            return
+        self.nbytes -= nbytes
+
+    def _evict(self, max_bytes, reserved_entries=0):
+        """Evict least recently used entries until total size <= max_bytes
+        (and number of entries + reserved_entries <= max_entries)"""
+        max_entries = math.inf if self.max_entries is None else self.max_entries
+        max_entries -= reserved_entries
+        while self._entries and (
+            self.nbytes > max_bytes or len(self._entries) > max_entries
+        ):
+            _, (_, nbytes) = self._entries.popitem(last=False)
+            self.nbytes -= nbytes
+
+    def _memory_deficit(self):
+        """Bytes missing to have min_available memory available on system"""
+        if self.min_available is None:
+            return 0
+        available = get_available_memory()
+        if available is None:
+            return 0
+        return max(self.min_available - available, 0)
+
+    def _namespace_info(self, namespace):
+        """Number of entries and bytes of a namespace"""
+        with self._lock:
+            sizes = [
+                nbytes for (namespace_, _), (_, nbytes) in self._entries.items()
+                if namespace_ == namespace
+            ]
+        return len(sizes), sum(sizes)
+
+
+class SharedMemoryCache:
+    """Cache of numpy arrays in shared memory, common to several processes.
+
+    Arrays are stored in blocks of shared memory (one per entry), indexed in
+    a dictionary managed by a multiprocessing manager process. The cache
+    object can be pickled and sent to other processes (e.g. workers of a
+    ProcessPoolExecutor), which then access the same entries: arrays are
+    returned as read-only, zero-copy views of the shared memory.
+
+    When the cache is full, oldest entries are evicted first. Only numpy
+    arrays (without Python objects) are stored, other values are ignored.
+    Shared memory is freed with close() (automatically called when the cache
+    object in the creating process is garbage collected or at exit).
+
+    Has the same interface as MemoryCache (see wrap()).
+    """
+
+    def __init__(self, max_bytes=None, max_entries=None):
+        """Init cache (starts a manager process).
+
+        Parameters
+        ----------
+        max_bytes : int or str, optional
+            maximum total size of entries (see MemoryCache).
+
+        max_entries : int, optional
+            maximum number of entries.
+        """
+        # Imported in functions using it, so that filo works with Python < 3.8
+        try:
+            from multiprocessing import shared_memory  # noqa: F401
+        except ImportError:
+            raise ImportError('SharedMemoryCache requires Python >= 3.8.') from None
+        self.max_bytes = None if max_bytes is None else parse_bytes(max_bytes)
+        self.max_entries = max_entries
+        manager = multiprocessing.Manager()
+        self._id = uuid.uuid4().hex
+        # {(namespace, key): (block name, shape, dtype, nbytes)}
+        self._index = manager.dict()
+        # removed: number of entries removed since creation
+        self._totals = manager.dict(nbytes=0, removed=0)
+        self._removed = 0  # value of removed at last _prune() in this process
+        self._lock = manager.Lock()
+        _PROXIES[self._id] = self._index, self._totals, self._lock
+        self._finalizer = weakref.finalize(
+            self, _close_shared_cache, self._id, manager,
+        )
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}, {len(self)} entries, "
+            f"{self.nbytes}/{self.max_bytes} bytes"
+        )
+
+    def __len__(self):
+        return len(self._index)
+
+    @property
+    def nbytes(self):
+        return self._totals['nbytes']
+
+    def __getstate__(self):
+        # Manager itself stays in creating process, which frees memory
+        state = self.__dict__.copy()
+        del state['_finalizer']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._finalizer = None
+        # All copies of the cache in a process use the same manager proxies;
+        # else, garbage collection of proxies of previous copies can close
+        # the connection to the manager while it is used.
+        proxies = _PROXIES.setdefault(self._id, (self._index, self._totals, self._lock))
+        self._index, self._totals, self._lock = proxies
+
+    # ============================ Public methods ============================
+
+    def get(self, namespace, key, default=None):
+        """Get entry as a read-only view of shared memory."""
+        try:
+            block, shape, dtype, _ = self._index[namespace, key]
+        except KeyError:
+            return default
+        if block not in _ATTACHED:
+            self._prune()
+        try:
+            shm = _attach_block(block)
+        except FileNotFoundError:  # evicted in the meantime
+            return default
+        array = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        array.flags.writeable = False
+        return array
+
+    def put(self, namespace, key, value):
+        """Copy array into shared memory, evicting oldest entries if needed.
+
+        Values that are not numpy arrays, or larger than the cache limit,
+        are not stored.
+        """
+        if not isinstance(value, np.ndarray) or value.dtype.hasobject:
+            return
+        nbytes = value.nbytes
+        if self.max_bytes is not None and nbytes > self.max_bytes:
+            return
+
+        self._prune()
+
+        # Copy outside of lock so that processes can write concurrently
+        block = f'filo_{self._id[:8]}{uuid.uuid4().hex[:8]}'
+        shm = _ATTACHED[block] = _open_block(block, size=max(nbytes, 1))
+        array = np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)
+        array[...] = value
+        del array
+
+        with self._lock:
+            if (namespace, key) in self._index:  # written by another process
+                evicted = [block]
+            else:
+                evicted = self._evict(nbytes)
+                info = block, value.shape, value.dtype.str, nbytes
+                self._index[namespace, key] = info
+                self._totals['nbytes'] = self._totals['nbytes'] + nbytes
+        for name in evicted:
+            _unlink_block(name)
+
+    def clear(self, namespace=None):
+        """Remove all entries (of a specific namespace if not None)."""
+        with self._lock:
+            evicted = []
+            for namespace_, key in self._index.keys():
+                if namespace is None or namespace_ == namespace:
+                    evicted.append(self._pop((namespace_, key)))
+        for name in evicted:
+            _unlink_block(name)
+
+    def close(self):
+        """Free shared memory and stop manager process (creating process)."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def wrap(self, function, namespace=None):
+        """Cache function in this cache (see CachedFunction)."""
+        namespace = function.__name__ if namespace is None else namespace
+        return CachedFunction(function, cache=self, namespace=namespace)
+
+    # ------------------------------ Internals -------------------------------
+
+    def _pop(self, index_key):
+        """Remove entry from index (with lock acquired); returns block name"""
+        block, _, _, nbytes = self._index.pop(index_key)
+        self._totals['nbytes'] = self._totals['nbytes'] - nbytes
+        self._totals['removed'] = self._totals['removed'] + 1
+        return block
+
+    def _prune(self):
+        """Close blocks attached in this process that have left the cache
+        (removed by any process), so that their memory can be released."""
+        removed = self._totals['removed']
+        if removed == self._removed:
+            return
+        self._removed = removed
+        prefix = f'filo_{self._id[:8]}'
+        current = {info[0] for info in self._index.values()}
+        for name in list(_ATTACHED):
+            if name.startswith(prefix) and name not in current:
+                _close_block(name)
+
+    def _evict(self, nbytes):
+        """Remove oldest entries to make room for nbytes (with lock acquired)"""
+        max_bytes = math.inf if self.max_bytes is None else self.max_bytes
+        max_entries = math.inf if self.max_entries is None else self.max_entries
+        evicted = []
+        total = self._totals['nbytes']
+        keys = iter(self._index.keys())  # insertion order, i.e. oldest first
+        n = len(self._index)
+        while n and (total + nbytes > max_bytes or n + 1 > max_entries):
+            block = self._pop(next(keys))
+            evicted.append(block)
+            total = self._totals['nbytes']
+            n -= 1
+        return evicted
+
+    def _namespace_info(self, namespace):
+        """Number of entries and bytes of a namespace"""
+        sizes = [
+            info[3] for (namespace_, _), info in self._index.items()
+            if namespace_ == namespace
+        ]
+        return len(sizes), sum(sizes)
+
+
+# Shared memory blocks attached in current process {name: SharedMemory};
+# they are kept open as long as arrays might use their memory.
+_ATTACHED = {}
+
+# Manager proxies of SharedMemoryCache objects in current process
+# {cache id: (index, totals, lock)}
+_PROXIES = {}
+
+
+def _open_block(name, size=None):
+    """Create (if size is not None) or attach shared memory block.
+
+    Blocks are not registered with the resource tracker of the process,
+    which would otherwise unlink them (with warnings) when the process
+    exits, while they belong to the cache (see _close_shared_cache()).
+    """
+    from multiprocessing import resource_tracker
+    from multiprocessing.shared_memory import SharedMemory
+    create = size is not None
+    size = 0 if size is None else size
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, create=create, size=size, track=False)
+    shm = SharedMemory(name=name, create=create, size=size)
+    if os.name == 'posix':
+        resource_tracker.unregister(shm._name, 'shared_memory')
+    return shm
+
+
+def _attach_block(name):
+    try:
+        return _ATTACHED[name]
+    except KeyError:
+        pass
+    shm = _ATTACHED[name] = _open_block(name)
+    return shm
+
+
+def _close_block(name):
+    """Close block in this process, unless arrays still use its memory"""
+    try:
+        _ATTACHED[name].close()
+    except BufferError:  # kept, closed at a next _prune() or _unlink_block()
+        return
+    del _ATTACHED[name]
+
+
+def _unlink_block(name):
+    """Free shared memory block (memory is released when all processes
+    using it have closed it)."""
+    try:
+        shm = _attach_block(name)
+    except FileNotFoundError:
+        _ATTACHED.pop(name, None)
+        return
+    if sys.version_info < (3, 13) and os.name == 'posix':
+        # unlink() unregisters the block, which was not registered
+        from multiprocessing import resource_tracker
+        resource_tracker.register(shm._name, 'shared_memory')
+    shm.unlink()
+    _close_block(name)
+
+
+def _close_shared_cache(cache_id, manager):
+    """Unlink all shared memory of a SharedMemoryCache and stop manager"""
+    index, _, lock = _PROXIES.pop(cache_id)
+    try:
+        with lock:
+            blocks = [info[0] for info in index.values()]
+            index.clear()
+    except (OSError, EOFError):  # manager already stopped (e.g. at exit)
+        blocks = []
+    for name in blocks:
+        _unlink_block(name)
+    manager.shutdown()
+
+
+class CachedFunction:
+    """Function whose results are stored in a MemoryCache.
+
+    Has the same cache_info() and cache_clear() methods as functions
+    decorated with functools.lru_cache.
+    """
+
+    def __init__(self, function, cache, namespace):
+        self.__wrapped__ = function
+        self.cache = cache
+        self.namespace = namespace
+        self.hits = 0
+        self.misses = 0
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.__wrapped__!r})"
+
+    def __call__(self, *args, **kwargs):
+        key = _make_key(args, kwargs)
+        value = self.cache.get(self.namespace, key, _MISSING)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+        self.misses += 1
+        value = self.__wrapped__(*args, **kwargs)
+        self.cache.put(self.namespace, key, value)
+        return value
+
+    def cache_info(self):
+        """Statistics of the cache (see functools.lru_cache)."""
+        currsize, nbytes = self.cache._namespace_info(self.namespace)
+        return CacheInfo(
+            hits=self.hits,
+            misses=self.misses,
+            maxsize=None,
+            currsize=currsize,
+            nbytes=nbytes,
+            max_bytes=self.cache.max_bytes,
+        )
+
+    def cache_clear(self):
+        """Remove cached results and reset statistics."""
+        self.cache.clear(self.namespace)
+        self.hits = 0
+        self.misses = 0
+
+
+class Prefetcher:
+    """Function called in advance in background threads on the next data.
+
+    The function takes a data identifier num as first argument (e.g.
+    DataSeriesReaderBase.read) and is supposed to store its results in a
+    cache. When successive calls are done with a constant step between nums
+    (e.g. 3, 5, 7), the function is called in the background on the next
+    nums in the same direction (9, 11, ...), with the same other arguments,
+    so that data is already in the cache when requested.
+    """
+
+    def __init__(self, function, window=8, max_workers=None, is_valid=None):
+        """Init prefetcher.
+
+        Parameters
+        ----------
+        function : callable
+            function(num, *args, **kwargs), thread-safe
+
+        window : int
+            maximum number of nums read in advance (in progress or waiting)
+
+        max_workers : int, optional
+            number of threads; if None (default), use default
+            in ThreadPoolExecutor.
+
+        is_valid : callable, optional
+            function(num) returning False for nums that do not exist and
+            must not be prefetched.
+        """
+        self.__wrapped__ = function
+        self.window = window
+        self.max_workers = max_workers
+        self.is_valid = is_valid
+        self._init_state()
+
+    def _init_state(self):
+        self._executor = None  # created at first prefetch
+        self._pending = {}     # {(num, key): future}
+        self._lock = threading.RLock()  # done callbacks can run in same thread
+        self._last = None      # (num, key) of last call
+        self._step = None
+        self._scheduled = set()  # nums submitted since access is regular
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.__wrapped__!r}, window={self.window})"
+
+    def __getstate__(self):
+        # Threads are not transferred e.g. to other processes
+        names = '__wrapped__', 'window', 'max_workers', 'is_valid'
+        return {name: self.__dict__[name] for name in names}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_state()
+
+    def __call__(self, num, *args, **kwargs):
+        key = _make_key(args, kwargs)
+        self._schedule(num, key, args, kwargs)
+        with self._lock:
+            future = self._pending.get((num, key))
+        if future is not None and not future.cancelled():
+            wait((future,))  # data being read: avoid reading it twice
+        return self.__wrapped__(num, *args, **kwargs)
+
+    def _schedule(self, num, key, args, kwargs):
+        """Detect access pattern and submit next nums if it is regular."""
+        with self._lock:
+            if self._last is not None and self._last[1] == key:
+                step = num - self._last[0]
+            else:
+                step = None
+            regular = bool(step) and step == self._step
+            self._last, self._step = (num, key), step
+
+            if not regular:  # Data in advance not needed anymore
+                for future in list(self._pending.values()):
+                    future.cancel()
+                self._scheduled.clear()
+                return
+
+            # Only keep nums ahead of current position (bounded by window)
+            self._scheduled = {n for n in self._scheduled if (n - num) * step > 0}
+
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+            for i in range(1, self.window + 1):
+                if len(self._pending) >= self.window:
+                    return
+                next_num = num + i * step
+                if self.is_valid is not None and not self.is_valid(next_num):
+                    return
+                if next_num in self._scheduled:
+                    continue
+                self._scheduled.add(next_num)
+                future = self._executor.submit(self._prefetch, next_num, args, kwargs)
+                self._pending[next_num, key] = future
+                future.add_done_callback(
+                    lambda _, pending_key=(next_num, key): self._done(pending_key)
+                )
+
+    def _prefetch(self, num, args, kwargs):
+        try:
+            self.__wrapped__(num, *args, **kwargs)
+        except Exception:
+            pass  # errors are raised when data is actually requested
+
+    def _done(self, pending_key):
+        with self._lock:
+            self._pending.pop(pending_key, None)
+
+    def cancel(self):
+        """Cancel reads in advance and wait for the ones in progress.
+
+        To call before clearing caches (e.g. when transforms change), so that
+        results calculated with previous parameters are not stored after.
+        """
+        with self._lock:
+            futures = list(self._pending.values())
+            for future in futures:
+                future.cancel()
+            self._last = self._step = None
+            self._scheduled.clear()
+        wait(futures)
+
+    def wait(self):
+        """Wait until data being read in advance is available."""
+        with self._lock:
+            futures = list(self._pending.values())
+        wait(futures)
+
+    def shutdown(self):
+        """Cancel reads in advance and stop threads."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+            for future in list(self._pending.values()):
+                future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+_MISSING = object()
+
+
+def _make_key(args, kwargs):
+    """Hashable (and picklable, for SharedMemoryCache) key from arguments"""
+    if not kwargs:
+        return args
+    return args, tuple(sorted(kwargs.items()))
+
+
+# ================================ Misc. tools ===============================
+
+
+_UNITS = {
+    '': 1, 'b': 1,
+    'kb': 1e3, 'mb': 1e6, 'gb': 1e9, 'tb': 1e12,
+    'kib': 2**10, 'mib': 2**20, 'gib': 2**30, 'tib': 2**40,
+}
+
+
+def parse_bytes(size):
+    """Number of bytes (int) from int or str with units, e.g. '2GB', '1.5 GiB'"""
+    if not isinstance(size, str):
+        return int(size)
+    match = re.fullmatch(r'\s*([\d.]+)\s*([a-zA-Z]*)\s*', size)
+    if match is None or match.group(2).lower() not in _UNITS:
+        raise ValueError(f'Invalid memory size: {size!r}')
+    value, unit = match.groups()
+    return int(float(value) * _UNITS[unit.lower()])
+
+
+def get_nbytes(value):
+    """Approximate memory size of object (bytes of numpy arrays, etc.)"""
+    try:
+        return int(value.nbytes)
+    except AttributeError:
+        pass
+    if isinstance(value, (tuple, list)):
+        return sys.getsizeof(value) + sum(get_nbytes(item) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(get_nbytes(item) for item in value.values())
+    return sys.getsizeof(value)
+
+
+_meminfo = {'time': None, 'available': None}
+
+
+def get_available_memory(max_age=0.5):
+    """Available memory of system in bytes (None if not known).
+
+    Read from /proc/meminfo (Linux only) at most every max_age seconds.
+    """
+    now = time.monotonic()
+    if _meminfo['time'] is not None and now - _meminfo['time'] < max_age:
+        return _meminfo['available']
+    available = None
+    try:
+        with open('/proc/meminfo', 'r') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) * 1024  # value in kB
+                    break
+    except OSError:
+        pass
+    _meminfo.update(time=now, available=available)
+    return available
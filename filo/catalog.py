@@ -0,0 +1,247 @@
+"""Catalog of file series stored in a SQLite database."""
+
+# Standard library
+import os
+import sqlite3
+from pathlib import Path
+
+# Non-standard
+import numpy as np
+import pandas as pd
+
+# Local imports
+from .file_series import FileSeries
+
+
+class FileCatalog:
+    """Catalog of files of one or several file series, in a SQLite database.
+
+    Contrary to FileSeries.info / CSV files, the catalog does not need to be
+    loaded in memory: queries (time ranges, nearest time, folders) are
+    answered directly by the database using indexes, and only the requested
+    files are loaded, as FileSeries objects.
+
+    Examples
+    --------
+    >>> catalog = FileCatalog('Catalog.db', refpath='data')
+    >>> series = FileSeries.auto(folders='data/run1', extension='.png')
+    >>> catalog.add(series, name='run1')
+    >>> catalog.between(1607500500, 1607500510, name='run1')  # FileSeries
+    >>> catalog.nearest(1607500503)  # filo.File
+    """
+
+    def __init__(self, filepath, refpath=None):
+        """Open (or create) catalog.
+
+        Parameters
+        ----------
+        filepath : {str, pathlib.Path}
+            SQLite database file
+
+        refpath : {str, pathlib.Path}, optional
+            reference path from which folders are expressed in the catalog;
+            if None (default), use the folder containing the database file.
+        """
+        self.filepath = Path(filepath)
+        self.refpath = self.filepath.parent if refpath is None else Path(refpath)
+        self.connection = sqlite3.connect(self.filepath)
+        self._create_tables()
+
+    def __repr__(self):
+        return f"{self.__class__.__name__} in {self.filepath}, {len(self)} files"
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM files').fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    # --------------------------- Database tools -----------------------------
+
+    def _create_tables(self):
+        with self.connection:
+            self.connection.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS folders (
+                    id INTEGER PRIMARY KEY,
+                    folder TEXT UNIQUE NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS files (
+                    series TEXT NOT NULL,
+                    num INTEGER NOT NULL,
+                    folder_id INTEGER NOT NULL REFERENCES folders(id),
+                    filename TEXT NOT NULL,
+                    time REAL,
+                    PRIMARY KEY (series, num)
+                );
+                CREATE INDEX IF NOT EXISTS files_series_time ON files (series, time);
+                CREATE INDEX IF NOT EXISTS files_time ON files (time);
+                CREATE INDEX IF NOT EXISTS files_folder ON files (folder_id);
+                """
+            )
+
+    def _folder_ids(self, folders):
+        """Get (and create if necessary) ids of folders (relative paths, str)"""
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO folders (folder) VALUES (?)',
+            ((folder,) for folder in folders),
+        )
+        ids = {}
+        for folder in folders:
+            query = 'SELECT id FROM folders WHERE folder = ?'
+            ids[folder], = self.connection.execute(query, (folder,)).fetchone()
+        return ids
+
+    def _select(self, where='', parameters=(), limit=None, order='num'):
+        """Build FileSeries from files matching SQL where clause."""
+        query = (
+            'SELECT files.num, folders.folder, files.filename, files.time '
+            'FROM files JOIN folders ON files.folder_id = folders.id '
+        )
+        if where:
+            query += f'WHERE {where} '
+        query += f'ORDER BY {order}'
+        if limit is not None:
+            query += f' LIMIT {int(limit)}'
+        data = pd.read_sql_query(query, self.connection, params=parameters)
+        folder_idx, foldernames = pd.factorize(data['folder'], sort=False)
+        return FileSeries._from_columns(
+            refpath=self.refpath,
+            folders=[self.refpath / foldername for foldername in foldernames],
+            folder_idx=folder_idx,
+            names=data['filename'].to_numpy(dtype=object),
+            nums=data['num'].to_numpy(),
+            times=data['time'].to_numpy(dtype=np.float64, na_value=np.nan),
+        )
+
+    @staticmethod
+    def _where(name=None, t0=None, t1=None, folder=None):
+        """SQL where clause and parameters corresponding to query"""
+        conditions, parameters = [], []
+        if name is not None:
+            conditions.append('files.series = ?')
+            parameters.append(name)
+        if t0 is not None:
+            conditions.append('files.time >= ?')
+            parameters.append(float(t0))
+        if t1 is not None:
+            conditions.append('files.time <= ?')
+            parameters.append(float(t1))
+        if folder is not None:
+            conditions.append('folders.folder = ?')
+            parameters.append(Path(folder).as_posix())  # as stored by add()
+        return ' AND '.join(conditions), parameters
+
+    # ============================ Public methods ============================
+
+    @property
+    def names(self):
+        """Names of the file series stored in the catalog."""
+        query = 'SELECT DISTINCT series FROM files ORDER BY series'
+        return [name for name, in self.connection.execute(query)]
+
+    def add(self, series, name='default', replace=True):
+        """Add files of a file series to the catalog (bulk insert).
+
+        Parameters
+        ----------
+        series : filo.FileSeries
+
+        name : str
+            name under which the series is stored in the catalog
+
+        replace : bool
+            if True (default), files already in the catalog under the same
+            name and num are replaced.
+        """
+        series.resolve_times()
+        folders = [
+            Path(os.path.relpath(folder, self.refpath)).as_posix()
+            for folder in series.folders
+        ]
+        insert = 'INSERT OR REPLACE' if replace else 'INSERT'
+        with self.connection:  # single transaction
+            ids = self._folder_ids(folders)
+            folder_ids = np.array([ids[folder] for folder in folders])
+            rows = zip(
+                [name] * len(series),
+                series._nums.tolist(),
+                folder_ids[series._folder_idx].tolist(),
+                series._names.tolist(),
+                series._times.tolist(),
+            )
+            self.connection.executemany(
+                f'{insert} INTO files (series, num, folder_id, filename, time) '
+                'VALUES (?, ?, ?, ?, ?)',
+                rows,
+            )
+
+    def discover(self, name='default', **kwargs):
+        """Create file series with FileSeries.auto() and add it to catalog.
+
+        Parameters
+        ----------
+        name : str
+            name under which the series is stored in the catalog
+
+        **kwargs
+            keyword arguments passed to FileSeries.auto()
+            (folders, extension, recursive, etc.)
+
+        Returns
+        -------
+        filo.FileSeries
+        """
+        series = FileSeries.auto(**kwargs)
+        self.add(series, name=name)
+        return series
+
+    def remove(self, name):
+        """Remove file series from catalog."""
+        with self.connection:
+            self.connection.execute('DELETE FROM files WHERE series = ?', (name,))
+
+    def to_series(self, name=None, t0=None, t1=None, folder=None):
+        """Load (subset of) files in catalog as a file series.
+
+        Parameters
+        ----------
+        name : str, optional
+            name of the series in the catalog; if None, consider all series
+            (in this case, nums might not be unique)
+
+        t0, t1 : float, optional
+            only load files with times between t0 and t1 (included)
+
+        folder : {str, pathlib.Path}, optional
+            only load files in this folder (relative to refpath)
+
+        Returns
+        -------
+        filo.FileSeries
+        """
+        where, parameters = self._where(name=name, t0=t0, t1=t1, folder=folder)
+        return self._select(where, parameters)
+
+    def between(self, t0, t1, name=None):
+        """Files with times between t0 and t1 (included), as a file series."""
+        return self.to_series(name=name, t0=t0, t1=t1)
+
+    def nearest(self, t, name=None):
+        """File with time closest to t (filo.File)."""
+        candidates = []
+        for condition, order in ('time <= ?', 'time DESC'), ('time >= ?', 'time'):
+            where, parameters = self._where(name=name)
+            where = ' AND '.join(filter(None, (where, f'files.{condition}')))
+            series = self._select(where, parameters + [float(t)], limit=1, order=order)
+            if len(series):
+                candidates.append(series[0])
+        if not candidates:
+            raise IndexError('No file with timing info in catalog.')
+        return min(candidates, key=lambda file: abs(file.unix_time - t))
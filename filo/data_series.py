@@ -148,7 +148,7 @@ class DataSeries:
             for name, method in self.reader.cached_methods.items()
         }
 
-    def clear_cache(self, which=None):
+    def clear_cache(self, which=None, start=None):
         """Clear specified cache.
 
         Parameters
@@ -157,6 +157,12 @@ class DataSeries:
             can be 'files' or 'transforms'
             (default: None, i.e. clear both)
 
+        start : str or None
+            if reader caches transforms stage by stage (cache_stages=True),
+            only clear intermediate results of transform named start and
+            of subsequent transforms (default: None, i.e. all transforms).
+            Final results of transforms are always cleared.
+
         Returns
         -------
         None
@@ -164,6 +170,10 @@ class DataSeries:
         if not self.reader.cache:
             return
 
+        # Prefetched data in progress would be stored after clearing
+        if self.reader.prefetcher is not None:
+            self.reader.prefetcher.cancel()
+
         if which in ('files', 'transforms'):
             self.reader.cached_methods[which].cache_clear()
         elif which is None:
@@ -172,6 +182,9 @@ class DataSeries:
         else:
             raise ValueError(f'{which} not a valid cache name.')
 
+        if which in ('transforms', None):
+            self.reader.clear_stages(start=start)
+
     # ============================= Main methods =============================
 
     def read(self, num=0, correction=True, transform=True, **kwargs):
@@ -209,6 +222,43 @@ class DataSeries:
             **kwargs,
         )
 
+    def read_many(
+        self,
+        nums,
+        correction=True,
+        transform=True,
+        max_workers=None,
+        **kwargs,
+    ):
+        """Read data of several identifiers into a single array (stack).
+
+        Data are read and processed in parallel in threads, directly into
+        preallocated arrays.
+
+        Parameters
+        ----------
+        nums : iterable of int
+            data identifiers
+
+        correction, transform, **kwargs : see read()
+
+        max_workers : int, optional
+            number of threads; if None (default), use default
+            in ThreadPoolExecutor.
+
+        Returns
+        -------
+        np.ndarray
+            data stacked along first axis, in the order of nums
+        """
+        return self.reader.read_many(
+            nums=nums,
+            correction=correction,
+            transform=transform,
+            max_workers=max_workers,
+            **kwargs,
+        )
+
     # ==================== Interactive inspection methods ====================
 
     def show(
@@ -1,12 +1,19 @@
 """Manage FileSeries of experimental data in potentially several folders."""
 
 import os
+import time
+import hashlib
+import operator
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 
-from .misc import make_iterable, list_files
+from .misc import make_iterable, scan_files, _scan_tree
+from .fileio import load_npz, load_json, to_json
+from .time_sources import MtimeSource
 
 
 # ================================= Classes ==================================
@@ -14,7 +21,10 @@ from .misc import make_iterable, list_files
 class File:
     """Individual file among the series of files. Used by FileSeries"""
 
-    def __init__(self, path, num=None, unix_time=None):
+    # _series, _position: series the file comes from (see FileSeries._make_file())
+    __slots__ = ('path', 'num', '_unix_time', '_series', '_position')
+
+    def __init__(self, path, num=None, unix_time=None, lazy=False):
         """Init File object
 
         Parameters
@@ -28,14 +38,19 @@ class File:
 
         unix_time : float [optional]
             if None, will be caculated automatically from file modification time
+
+        lazy : bool [optional]
+            if True and unix_time is None, the modification time is only
+            read from the file when unix_time is first accessed.
          """
         self.path = Path(path)
         self.num = num
+        self._unix_time = unix_time
+        self._series = None
+        self._position = None
 
-        if unix_time is None:
-            self.unix_time = self.get_unix_time()
-        else:
-            self.unix_time = unix_time
+        if unix_time is None and not lazy:
+            self._unix_time = self.get_unix_time()
 
     def __repr__(self):
         return f"filo.File #{self.num} [{self.name} in folder '{self.folder}']"
@@ -52,6 +67,23 @@ class File:
         """Automatically get unix time from file creation/modification time"""
         return self.path.stat().st_mtime
 
+    @property
+    def unix_time(self):
+        """Unix time of file (float), calculated on first access if lazy.
+
+        For files obtained from a series (e.g. series[i]), setting the time
+        also sets it in the series.
+        """
+        if self._unix_time is None:
+            self._unix_time = self.get_unix_time()
+        return self._unix_time
+
+    @unix_time.setter
+    def unix_time(self, value):
+        self._unix_time = value
+        if self._series is not None:
+            self._series._set_time(self._position, value)
+
     @property
     def datetime(self):
         """Returns datetime.datetime object from unix_time"""
@@ -74,7 +106,29 @@ class File:
 
 
 class FileSeries:
-    """Class to manage series of files in one or several folders."""
+    """Class to manage series of files in one or several folders.
+
+    File information is stored internally in columns (arrays of folder
+    indices, filenames, nums and times) rather than as individual File
+    objects, which are only created on demand, e.g. when indexing the series.
+
+    Slicing, boolean masks, filter() and between() return sub-series that
+    are views on the same columns (no copy of data for slices). Times set in
+    a sub-series (update_times(), set_times(), File.unix_time etc.) are also
+    set in the full series; however, sub-series created with masks, filter()
+    and between() hold a copy of times, which does not see times changed
+    afterwards in the full series or in other sub-series.
+    """
+
+    # Default file used to cache file detection (see auto())
+    MANIFEST_FILENAME = 'FileSeries_Manifest.json'
+
+    # Resolution (s) of folder modification times, coarse on some network
+    # file systems (SMB, NAS); see _settled_mtime()
+    MTIME_RESOLUTION = 2
+
+    # How to get file times (subclass of filo.TimeSourceBase)
+    time_source = MtimeSource()
 
     def __init__(self, files, refpath='.'):
         """Init file series object.
@@ -87,9 +141,24 @@ class FileSeries:
             reference path from which folders are expressed from in the
             info attribute and when saving to CSV.
         """
-        self._files = files
-        self.folders = self._list_folders()
-        self.refpath = Path(refpath)
+        # Counter of modifications of file info, shared with views so that
+        # caches (info etc.) are invalidated when shared columns change
+        self._version = [0]
+        self._cache = {}  # {name: (version, cached value)}
+
+        self._set_files(files)
+        self.refpath = refpath
+
+        # Used by refresh() to detect new files (None if unknown, e.g.
+        # series created from a CSV file, see _refresh_extension())
+        self.extension = None
+        self._folder_state = {}  # {folder: (mtime_ns, last filename)}
+        self._tree_state = None  # series detected with recursive=True
+
+        # For sub-series (see _view()): full series, and positions of files
+        # in the full series (range for slices, else array of int)
+        self._root = None
+        self._root_positions = None
 
     def __repr__(self):
         relative_folders = [
@@ -97,51 +166,421 @@ class FileSeries:
         ]
         return (
             f"{self.__class__.__name__} in {self.refpath} / {relative_folders}, "
-            f"{len(self._files)} files]"
+            f"{len(self)} files]"
         )
 
+    def __len__(self):
+        return len(self._names)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._make_file(i)
+
     def __getitem__(self, key):
-        """To make file series indexable and sliceable."""
-        return self._files[key]
+        """To make file series indexable and sliceable.
+
+        Parameters
+        ----------
+        key : int, slice, or array_like of bool or int
+            position(s) of files in the series
+
+        Returns
+        -------
+        filo.File if key is an integer, else filo.FileSeries (sub-series
+        sharing the columns of the series, see _view())
+        """
+        if isinstance(key, slice):
+            return self._view(key)
+        if not isinstance(key, (bool, np.bool_)):
+            try:
+                i = operator.index(key)
+            except TypeError:
+                pass
+            else:
+                return self._make_file(range(len(self))[i])
+        positions = np.asarray(key)
+        if positions.dtype != bool and not np.issubdtype(positions.dtype, np.integer):
+            raise TypeError(f'Invalid index for {self.__class__.__name__}: {key}')
+        return self._view(positions)
 
     # --------------------------- Misc. init tools ---------------------------
 
-    def _list_folders(self):
-        """Detect the various folders the files are in from self._files"""
-        folders = []
-        for file in self._files:
-            if file.folder not in folders:
-                folders.append(file.folder)
-        return folders
+    def _set_files(self, files):
+        """Store info of iterable of filo.File objects into columns."""
+        folders = {}
+        folder_idx, names, nums, times = [], [], [], []
+        for file in files:
+            folder_idx.append(folders.setdefault(file.folder, len(folders)))
+            names.append(file.name)
+            nums.append(file.num)
+            unix_time = file._unix_time
+            times.append(np.nan if unix_time is None else unix_time)
+        self._set_columns(
+            folders=list(folders),
+            folder_idx=folder_idx,
+            names=names,
+            nums=nums,
+            times=times,
+        )
+
+    def _set_columns(self, folders, folder_idx, names, nums, times):
+        """Store file info in columns.
+
+        Parameters
+        ----------
+        folders : list of pathlib.Path
+            folders in which the files are
+
+        folder_idx : array_like of int
+            index in folders of the folder of every file
+
+        names : array_like of str
+            filenames
+
+        nums : array_like of int
+            file identifiers
+
+        times : array_like of float
+            unix times of files (NaN if not determined yet)
+        """
+        self.folders = folders
+        self._folder_idx = np.asarray(folder_idx, dtype=np.int32)
+        self._names = np.asarray(names, dtype=object)
+        self._nums = np.asarray(nums, dtype=np.int64)
+        self._times = np.asarray(times, dtype=np.float64)
+        # False for files whose time has not been asked to the time source
+        # yet (files for which the time source returns NaN are not retried)
+        self._resolved = ~np.isnan(self._times)
+        self._reset_cache()
+
+    def _reset_cache(self):
+        """To call every time file info (e.g. times) is modified."""
+        self._version[0] += 1
+
+    def _get_cached(self, name, calculate):
+        """Get cached value, re-calculated if file info has changed.
+
+        Parameters
+        ----------
+        name : str
+            name of the cached value
+
+        calculate : callable
+            function without arguments returning the value
+        """
+        version, value = self._cache.get(name, (None, None))
+        if version != self._version[0]:
+            value = calculate()
+            # version read after calculation, which can modify info (times)
+            self._cache[name] = self._version[0], value
+        return value
+
+    def _view(self, key):
+        """Sub-series sharing columns and folders with the series.
+
+        Parameters
+        ----------
+        key : slice or array of bool or int
+            positions of files in the series; with slices the columns of
+            the sub-series are views on the columns of the series (no copy).
+        """
+        series = self._from_columns(
+            refpath=self.refpath,
+            folders=self.folders,
+            folder_idx=self._folder_idx[key],
+            names=self._names[key],
+            nums=self._nums[key],
+            times=self._times[key],
+        )
+        series._resolved = self._resolved[key]
+        if self._root is None:
+            series._root, positions = self, range(len(self))
+        else:
+            series._root, positions = self._root, self._root_positions
+        if isinstance(positions, range) and not isinstance(key, slice):
+            positions = np.arange(positions.start, positions.stop, positions.step)
+        series._root_positions = positions[key]
+        series._version = self._version
+        series.time_source = self.time_source
+        series.extension = self.extension
+        return series
+
+    @classmethod
+    def _from_columns(cls, refpath='.', **columns):
+        """Create file series directly from columns (see _set_columns())"""
+        series = cls(files=(), refpath=refpath)
+        series._set_columns(**columns)
+        return series
+
+    def _make_file(self, i):
+        """Create filo.File object from info at position i in the series."""
+        folder = self.folders[self._folder_idx[i]]
+        file = File(
+            path=folder / self._names[i],
+            num=int(self._nums[i]),
+            unix_time=self._get_time(i),
+        )
+        file._series, file._position = self, i
+        return file
+
+    def _get_time(self, i):
+        """Unix time of file at position i, read from file if not known yet."""
+        if not self._resolved[i]:
+            self._write_times([i], self.time_source.get_times(self._filepaths([i])))
+        return float(self._times[i])
+
+    def _set_time(self, i, unix_time):
+        """Set unix time of file at position i (e.g. from File.unix_time)."""
+        self._write_times([i], [unix_time])
+
+    def _write_times(self, positions, times, resolved=True):
+        """Set times of files at positions, also in the full series if the
+        series is a sub-series (all modifications of times go through here).
+
+        Parameters
+        ----------
+        positions : array_like of int
+        times : array_like of float
+        resolved : bool
+            if False, times have to be asked to the time source (see
+            resolve_times()).
+        """
+        positions = np.asarray(positions, dtype=np.intp)
+        times = np.asarray(times, dtype=np.float64)
+        old_times = self._times[positions]
+        changed = not np.all((old_times == times) | (np.isnan(old_times) & np.isnan(times)))
+        targets = [(self, positions)]
+        if self._root is not None:
+            targets.append((self._root, self._to_root(positions)))
+        for series, series_positions in targets:
+            series._times[series_positions] = times
+            series._resolved[series_positions] = resolved
+        if changed:
+            self._reset_cache()
+
+    def _to_root(self, positions):
+        """Positions in the full series of files at positions in the series"""
+        root_positions = self._root_positions
+        if isinstance(root_positions, range):
+            return root_positions.start + root_positions.step * np.asarray(positions)
+        return root_positions[positions]
+
+    def _filepaths(self, positions):
+        """List of paths (str) of files at given positions in the series."""
+        folders = [os.fspath(folder) for folder in self.folders]
+        return [
+            os.path.join(folders[self._folder_idx[i]], self._names[i])
+            for i in positions
+        ]
+
+    @staticmethod
+    def _entries_info(entries, lazy_times=False):
+        """Names and times of files from list of os.DirEntry objects.
+
+        Parameters
+        ----------
+        entries : list of os.DirEntry
+        lazy_times : bool
+            if True, do not get file modification times (NaN instead)
+
+        Returns
+        -------
+        tuple
+            (names, times), lists of filenames and unix times
+        """
+        names = [entry.name for entry in entries]
+        if lazy_times:
+            times = [np.nan] * len(entries)
+        else:
+            times = [entry.stat().st_mtime for entry in entries]  # cached
+        return names, times
+
+    @classmethod
+    def _scan_folder(cls, folder, extension, lazy_times=False, after=''):
+        """Names and times of files in folder, with names sorted after `after`.
+
+        Parameters
+        ----------
+        folder : pathlib.Path
+        extension : str or iterable of str
+        lazy_times : bool
+            if True, do not get file modification times (NaN instead)
+        after : str
+            only consider files with names greater than this one
+
+        Returns
+        -------
+        tuple
+            (names, times), lists of filenames and unix times
+        """
+        entries = [
+            entry for entry in scan_files(folder, extension) if entry.name > after
+        ]
+        return cls._entries_info(entries, lazy_times=lazy_times)
 
     @staticmethod
-    def _detect_files(folders, extension):
-        """Create list of filo.File objects by automatic detection in folders.
+    def _to_columns(scanned):
+        """Assemble info of scanned folders into columns.
+
+        Parameters
+        ----------
+        scanned : iterable of tuples
+            (folder, names, times) for every scanned folder
+
+        Returns
+        -------
+        dict
+            columns to pass to _set_columns()
+        """
+        folders = []
+        folder_idx, names, times = [], [], []
+        for folder, folder_names, folder_times in scanned:
+            if not folder_names:
+                continue
+            folder_idx += [len(folders)] * len(folder_names)
+            folders.append(folder)
+            names += folder_names
+            times += folder_times
+        return {
+            'folders': folders,
+            'folder_idx': folder_idx,
+            'names': names,
+            'nums': np.arange(len(names)),
+            'times': times,
+        }
+
+    @classmethod
+    def _detect_files(
+        cls,
+        folders,
+        extension,
+        lazy_times=False,
+        manifest=None,
+        cached_times=True,
+    ):
+        """Detect files in folders and return their info as columns.
 
         Used by Files.auto()
 
         Parameters
         ----------
         folders : iterable of pathlib.Path
-        extension : str
+        extension : str or iterable of str
+        lazy_times : bool
+            if True, do not get file modification times (NaN instead)
+        manifest : _DiscoveryManifest, optional
+            if provided, unmodified folders are not scanned again, and
+            the manifest is updated with folders that are scanned.
+        cached_times : bool
+            if False, times stored in the manifest (file modification times)
+            are not used (NaN instead), e.g. if times come from another
+            time source.
 
         Returns
         -------
-        list
-            list of filo.File objects.
+        tuple
+            (columns, folder_state) with columns a dict to pass to
+            _set_columns(), and folder_state a dict {folder: (mtime, name)}
+            with folder modification time (ns) and last filename,
+            used by refresh() (mtime None if modified just before the scan,
+            see _settled_mtime()).
         """
-        files = []
-        num = -1
+        scanned = []
+        folder_state = {}
         for folder in folders:
-            for filepath in list_files(folder, extension):
-                num += 1
-                files.append(File(path=filepath, num=num))
-        return files
+            folder = Path(folder)
+            scan_time = time.time()
+            # stat before scan, so that files added during scan are not missed
+            try:
+                stat = os.stat(folder)
+            except FileNotFoundError:  # no files yet, see refresh()
+                folder_state[folder] = None, ''
+                scanned.append((folder, [], []))
+                continue
+            mtime = cls._settled_mtime(stat.st_mtime_ns, scan_time)
+            cached = None if manifest is None else manifest.get(folder, stat, extension)
+            if cached is not None:
+                names, times = cached
+                if not cached_times:
+                    times = [np.nan] * len(names)
+            else:
+                names, times = cls._scan_folder(
+                    folder=folder,
+                    extension=extension,
+                    lazy_times=lazy_times,
+                )
+                if manifest is not None and mtime is not None:
+                    manifest.set(folder, stat, extension, names, times)
+            folder_state[folder] = mtime, names[-1] if names else ''
+            scanned.append((folder, names, times))
+        return cls._to_columns(scanned), folder_state
+
+    @classmethod
+    def _detect_tree(
+        cls,
+        folders,
+        extension,
+        lazy_times=False,
+        include=None,
+        exclude=None,
+        max_workers=None,
+    ):
+        """Detect files in folders and their subfolders (see misc.scan_tree)
+
+        Used by Files.auto(recursive=True); returns the same as _detect_files(),
+        plus tree_state, a dict with the modification times of all scanned
+        folders (including folders without files), used by refresh() to
+        find new subfolders.
+        """
+        tree_state = {
+            'roots': {},  # {root: {relative folder (tuple): mtime}}
+            'include': include,
+            'exclude': exclude,
+            'max_workers': max_workers,
+        }
+        scanned = []
+        folder_state = {}
+        for root in folders:
+            root = Path(root)
+            scan_time = time.time()
+            results = _scan_tree(
+                root,
+                extension=extension,
+                include=include,
+                exclude=exclude,
+                max_workers=max_workers,
+            )
+            tree_state['roots'][root] = {
+                relfolder: cls._settled_mtime(mtime, scan_time)
+                for relfolder, (mtime, _) in results.items()
+            }
+            # Sorting tuples of folder parts puts subfolders after their parent
+            for relfolder in sorted(results):
+                mtime, entries = results[relfolder]
+                if not entries:
+                    continue
+                folder = root.joinpath(*relfolder)
+                names, times = cls._entries_info(entries, lazy_times=lazy_times)
+                folder_state[folder] = cls._settled_mtime(mtime, scan_time), names[-1]
+                scanned.append((folder, names, times))
+        return cls._to_columns(scanned), folder_state, tree_state
 
     # ============= Class methods to generate FileSeries objects =============
 
     @classmethod
-    def auto(cls, folders='.', extension='', refpath='.'):
+    def auto(
+        cls,
+        folders='.',
+        extension='',
+        refpath='.',
+        lazy_times=False,
+        manifest=None,
+        time_source=None,
+        recursive=False,
+        include=None,
+        exclude=None,
+        max_workers=None,
+    ):
         """Create file series by automatic detection of files in paths or folders
 
         Parameters
@@ -150,13 +589,49 @@ class FileSeries:
             can be a string, path object, or a list of str/paths if data
             is stored in multiple folders.
 
-        extension : str
-            extension of files to be considered (e.g. '.txt')
+        extension : str or iterable of str
+            extension of files to be considered (e.g. '.txt'),
+            or several extensions (e.g. ('.png', '.tif'))
 
         refpath : {str, pathlib.Path}, optional
             reference path from which folders are expressed from in the
             info attribute and when saving to CSV.
 
+        lazy_times : bool, optional
+            if True, file modification times are not read during detection,
+            but only when needed (e.g. when accessing the info attribute),
+            in bulk with resolve_times(). Useful for very large series, or
+            when times are updated from external data anyway.
+
+        manifest : {str, pathlib.Path, bool}, optional
+            file in which to cache the results of file detection (filenames
+            and times in every folder); if True, use the default file
+            MANIFEST_FILENAME in refpath. When the manifest exists, folders
+            whose modification time and size have not changed since they
+            were last scanned are not scanned again.
+            Note: changes in file contents/times that do not modify the folder
+            itself (e.g. overwriting an existing file) are not detected.
+            Folders modified less than MTIME_RESOLUTION seconds before their
+            scan are not stored, since later changes might not be detected.
+
+        time_source : filo.TimeSourceBase subclass, optional
+            how to get file times (e.g. filo.FilenameTimeSource(...)).
+            If None (default), use the time_source class attribute, which is
+            the file modification time (filo.MtimeSource()) by default.
+
+        recursive : bool, optional
+            if True, also detect files in all subfolders of folders, which
+            are scanned concurrently (see filo.scan_tree()). Files are
+            numbered by folder, subfolders coming right after their parent,
+            all sorted by name. Not compatible with manifest.
+
+        include, exclude : str or iterable of str, optional
+            only if recursive=True: glob patterns to select files from their
+            path relative to the folders (see filo.scan_tree()).
+
+        max_workers : int, optional
+            only if recursive=True: number of threads scanning folders.
+
         Returns
         -------
         filo.FileSeries
@@ -165,8 +640,53 @@ class FileSeries:
             folders = folders,
         else:
             folders = make_iterable(folders)
-        files = cls._detect_files(folders=folders, extension=extension)
-        return cls(files=files, refpath=refpath)
+
+        if manifest is True:
+            manifest = Path(refpath) / cls.MANIFEST_FILENAME
+        if manifest:
+            manifest = _DiscoveryManifest(manifest)
+        else:
+            manifest = None
+
+        if time_source is None:
+            time_source = cls.time_source
+
+        # Modification times are directly available when scanning folders
+        use_mtimes = not lazy_times and isinstance(time_source, MtimeSource)
+
+        if recursive:
+            if manifest is not None:
+                raise ValueError('Manifest not available in recursive mode.')
+            columns, folder_state, tree_state = cls._detect_tree(
+                folders=folders,
+                extension=extension,
+                lazy_times=not use_mtimes,
+                include=include,
+                exclude=exclude,
+                max_workers=max_workers,
+            )
+        else:
+            columns, folder_state = cls._detect_files(
+                folders=folders,
+                extension=extension,
+                lazy_times=not use_mtimes,
+                manifest=manifest,
+                cached_times=isinstance(time_source, MtimeSource),
+            )
+            tree_state = None
+
+        series = cls._from_columns(refpath=refpath, **columns)
+        series.time_source = time_source
+        series.extension = extension
+        series._folder_state = folder_state
+        series._tree_state = tree_state
+        if not lazy_times:
+            series.resolve_times()
+
+        if manifest is not None:
+            manifest.save()
+
+        return series
 
     @classmethod
     def from_csv(cls, filepath, sep='\t', refpath='.'):
@@ -191,47 +711,594 @@ class FileSeries:
         -------
         filo.FileSeries
         """
-        files = []
-        data = pd.read_csv(filepath, sep=sep).set_index('num')
-        for num in data.index:
-            filename = data.at[num, 'filename']
-            foldername = data.at[num, 'folder']
-            unix_time = data.at[num, 'time (unix)']
-            filepath = Path(refpath) / foldername / filename
-            files.append(File(path=filepath, num=num, unix_time=unix_time))
-        return cls(files=files, refpath=refpath)
+        data = pd.read_csv(
+            filepath,
+            sep=sep,
+            dtype={'folder': str, 'filename': str},
+        )
+        folder_idx, foldernames = pd.factorize(data['folder'], sort=False)
+        return cls._from_columns(
+            refpath=refpath,
+            folders=[Path(refpath) / foldername for foldername in foldernames],
+            folder_idx=folder_idx,
+            names=data['filename'].to_numpy(dtype=object),
+            nums=data['num'].to_numpy(),
+            times=data['time (unix)'].to_numpy(),
+        )
+
+    @classmethod
+    def from_npz(cls, filepath, refpath='.', mmap=True):
+        """Create file series using information stored in binary file.
+
+        See FileSeries.to_npz()
+
+        Parameters
+        ----------
+        filepath : {str, pathlib.Path}
+            file in which info on the file series is stored
+
+        refpath : {str, pathlib.Path}, optional
+            reference path from which folders are expressed from in the
+            file.
+
+        mmap : bool, optional
+            if True (default), memory-map the numeric columns (nums, times
+            etc.) instead of reading them, which is faster for large series.
+
+        Returns
+        -------
+        filo.FileSeries
+        """
+        data = load_npz(filepath, mmap_keys=('folder_idx', 'nums', 'times') if mmap else ())
+        foldernames = _bytes_to_strings(data['folders'])
+        return cls._from_columns(
+            refpath=refpath,
+            folders=[Path(refpath) / foldername for foldername in foldernames],
+            folder_idx=data['folder_idx'],
+            names=_bytes_to_strings(data['filenames']),
+            nums=data['nums'],
+            times=data['times'],
+        )
 
     # =========================== Public methods =============================
 
+    @property
+    def refpath(self):
+        return self._refpath
+
+    @refpath.setter
+    def refpath(self, value):
+        self._refpath = Path(value)
+        self._reset_cache()  # folders in info are relative to refpath
+
     @property
     def info(self):
         """Dataframe with all file info.
 
+        The dataframe is cached and only re-calculated when file info
+        changes; do not modify it in place (use info.copy() if needed).
+
         Returns
         ------
         pandas dataframe with 'num' as index and 'time (unix)', folder, filename
         as columns.
         """
+        return self._get_cached('info', self._make_info)
+
+    def _make_info(self):
+        """Generate info dataframe (see self.info)"""
+        self.resolve_times()
+        relative_folders = np.array(
+            [os.path.relpath(folder, self.refpath) for folder in self.folders],
+            dtype=object,
+        )
         data = {
-            'num': [file.num for file in self._files],
-            'folder': [os.path.relpath(f.folder, self.refpath) for f in self._files],
-            'filename': [file.name for file in self._files],
-            'time (unix)': [file.unix_time for file in self._files],
+            'num': self._nums,
+            'folder': relative_folders[self._folder_idx],
+            'filename': self._names,
+            'time (unix)': self._times,
         }
         return pd.DataFrame(data).set_index('num')
 
+    def resolve_times(self):
+        """Get times of all files whose time is not known yet.
+
+        Times are obtained in bulk from the time source of the series
+        (by default, files are stat'ed concurrently in a thread pool, which
+        is much faster than one after the other on high-latency filesystems).
+        """
+        unresolved = np.flatnonzero(~self._resolved)
+        if not unresolved.size:
+            return
+        filepaths = self._filepaths(unresolved)
+        self._write_times(unresolved, self.time_source.get_times(filepaths))
+
+    def set_times(self, time_source=None):
+        """Re-calculate times of all files from a time source.
+
+        Parameters
+        ----------
+        time_source : filo.TimeSourceBase subclass, optional
+            if not None, becomes the new time source of the series
+            (e.g. filo.FilenameTimeSource(...)); if None, use the current one.
+        """
+        if time_source is not None:
+            self.time_source = time_source
+        self._write_times(np.arange(len(self)), np.full(len(self), np.nan), resolved=False)
+        self.resolve_times()
+
+    def refresh(self, lazy_times=False):
+        """Add files that appeared in the folders of the series since last scan.
+
+        Only folders whose modification time has changed are re-listed, and
+        only files with names sorted after the last known file of the folder
+        are considered (and stat'ed), as is the case e.g. for images
+        continuously written during an acquisition.
+        For series detected with recursive=True, new subfolders (e.g. new
+        day/hour folders of an acquisition) are also explored.
+        New files are appended at the end of the series with consecutive nums.
+
+        Files are selected with the extension given to FileSeries.auto();
+        for series created otherwise (e.g. from_csv(), from_npz()), with the
+        extensions of the files of the series, unless the extension
+        attribute is set.
+
+        Parameters
+        ----------
+        lazy_times : bool, optional
+            if True, do not get times of new files (see FileSeries.auto())
+
+        Returns
+        -------
+        list
+            list of filo.File objects that have been added to the series.
+
+        Raises
+        ------
+        ValueError
+            if the series is a sub-series (view) of another series, or if
+            the extension of files is unknown.
+        """
+        if self._root is not None:
+            raise ValueError('Cannot refresh a sub-series, refresh the full series.')
+
+        if self.extension is None:
+            self.extension = self._refresh_extension()
+
+        use_mtimes = not lazy_times and isinstance(self.time_source, MtimeSource)
+
+        if self._tree_state is not None:
+            scanned = self._refresh_tree(lazy_times=not use_mtimes)
+        else:
+            scanned = self._refresh_folders(lazy_times=not use_mtimes)
+
+        folder_positions = {folder: i for i, folder in enumerate(self.folders)}
+        folder_idx, names, times = [], [], []
+        for folder, folder_names, folder_times in scanned:
+            if folder not in folder_positions:
+                folder_positions[folder] = len(self.folders)
+                self.folders.append(folder)
+            folder_idx += [folder_positions[folder]] * len(folder_names)
+            names += folder_names
+            times += folder_times
+
+        if not names:
+            return []
+
+        n = len(self)
+        first_num = self._nums[-1] + 1 if n else 0
+        resolved = self._resolved
+        self._set_columns(
+            folders=self.folders,
+            folder_idx=np.concatenate((self._folder_idx, folder_idx)),
+            names=np.concatenate((self._names, names)),
+            nums=np.concatenate((self._nums, first_num + np.arange(len(names)))),
+            times=np.concatenate((self._times, times)),
+        )
+        self._resolved[:n] = resolved
+        if not lazy_times:
+            self.resolve_times()
+        return list(self[n:])
+
+    def follow(self, interval=1, timeout=None, lazy_times=False):
+        """Generator that waits for new files and yields them as they appear.
+
+        Parameters
+        ----------
+        interval : float, optional
+            time (s) between two checks for new files (see refresh())
+
+        timeout : float, optional
+            stop after this time (s); if None (default), wait indefinitely.
+
+        lazy_times : bool, optional
+            if True, do not get times of new files
+
+        Yields
+        ------
+        list
+            list of new filo.File objects, already added to the series.
+
+        Examples
+        --------
+        >>> for new_files in series.follow(interval=5):
+        >>>     ...
+        """
+        if self._root is not None:
+            raise ValueError('Cannot follow a sub-series, follow the full series.')
+        t0 = time.monotonic()
+        while timeout is None or time.monotonic() - t0 < timeout:
+            new_files = self.refresh(lazy_times=lazy_times)
+            if new_files:
+                yield new_files
+            else:
+                time.sleep(interval)
+
+    def _refresh_folders(self, lazy_times=False):
+        """New files in folders of the series, as (folder, names, times)"""
+        if not self._folder_state:  # e.g. series not created with auto()
+            self._folder_state = self._get_folder_state()
+
+        scanned = []
+        for folder, (mtime, last_name) in self._folder_state.items():
+            scan_time = time.time()
+            try:
+                new_mtime = os.stat(folder).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if new_mtime == mtime:
+                continue
+            folder_names, folder_times = self._scan_folder(
+                folder=folder,
+                extension=self.extension,
+                lazy_times=lazy_times,
+                after=last_name,
+            )
+            if folder_names:
+                last_name = folder_names[-1]
+                scanned.append((folder, folder_names, folder_times))
+            self._folder_state[folder] = self._settled_mtime(new_mtime, scan_time), last_name
+        return scanned
+
+    def _refresh_tree(self, lazy_times=False):
+        """New files in folder trees of the series (recursive=True), including
+        in new subfolders, as (folder, names, times).
+
+        Only folders whose modification time has changed are listed again,
+        and subfolders that were not known are explored.
+        """
+        scanned = []
+        for root, known in self._tree_state['roots'].items():
+            scan_time = time.time()
+            changed = [] if known else [()]  # root not existing at last scan
+            for relfolder, mtime in list(known.items()):
+                try:
+                    new_mtime = os.stat(root.joinpath(*relfolder)).st_mtime_ns
+                except FileNotFoundError:  # folder deleted
+                    del known[relfolder]
+                    continue
+                if new_mtime != mtime:
+                    changed.append(relfolder)
+            if not changed:
+                continue
+            results = _scan_tree(
+                root,
+                extension=self.extension,
+                include=self._tree_state['include'],
+                exclude=self._tree_state['exclude'],
+                max_workers=self._tree_state['max_workers'],
+                start=changed,
+                known=known,
+            )
+            for relfolder in sorted(results):
+                mtime, entries = results[relfolder]
+                mtime = self._settled_mtime(mtime, scan_time)
+                known[relfolder] = mtime
+                folder = root.joinpath(*relfolder)
+                _, last_name = self._folder_state.get(folder, (None, ''))
+                entries = [entry for entry in entries if entry.name > last_name]
+                if entries:
+                    names, times = self._entries_info(entries, lazy_times=lazy_times)
+                    last_name = names[-1]
+                    scanned.append((folder, names, times))
+                self._folder_state[folder] = mtime, last_name
+        return scanned
+
+    def _refresh_extension(self):
+        """Extensions of files in the series, for refresh()"""
+        extensions = {os.path.splitext(name)[1] for name in self._names} - {''}
+        if not extensions:
+            raise ValueError(
+                'Extension of files unknown: set the extension attribute of '
+                'the series (e.g. series.extension = ".png") before refresh().'
+            )
+        return tuple(sorted(extensions))
+
+    @classmethod
+    def _settled_mtime(cls, mtime, scan_time):
+        """Folder modification time (ns) to store for refresh(), or None if
+        the folder was modified within MTIME_RESOLUTION of its scan (time.time()
+        before scan): files added just after the scan might then not change
+        the modification time, and the folder has to be scanned again."""
+        if scan_time - mtime / 1e9 < cls.MTIME_RESOLUTION:
+            return None
+        return mtime
+
+    def _get_folder_state(self):
+        """Last filename in every folder, with unknown modification time"""
+        last_names = pd.Series(self._names).groupby(self._folder_idx).max()
+        return {
+            folder: (None, last_names.get(i, ''))
+            for i, folder in enumerate(self.folders)
+        }
+
+    # --------------------------- Folder grouping ----------------------------
+
+    def _make_folder_runs(self):
+        """Folder index, start and stop positions of runs of files in same folder"""
+        folder_idx = self._folder_idx
+        starts = np.flatnonzero(np.diff(folder_idx)) + 1
+        starts = np.concatenate(([0], starts)) if len(folder_idx) else starts
+        stops = np.append(starts[1:], len(folder_idx))
+        return folder_idx[starts], starts, stops
+
+    def by_folder(self):
+        """Group files by folder.
+
+        Files of a folder are in general consecutive in the series, in which
+        case the corresponding sub-series is a slice of the series (no copy).
+
+        Returns
+        -------
+        dict
+            {folder (pathlib.Path): filo.FileSeries sub-series (view)}
+        """
+        runs = {}
+        folder_ids, starts, stops = self._get_cached(
+            'folder_runs',
+            self._make_folder_runs,
+        )
+        for i, start, stop in zip(folder_ids, starts, stops):
+            runs.setdefault(i, []).append(slice(start, stop))
+        groups = {}
+        for i, slices in runs.items():
+            if len(slices) == 1:
+                key, = slices
+            else:  # e.g. files added to a folder with refresh()
+                key = np.concatenate([np.arange(s.start, s.stop) for s in slices])
+            groups[self.folders[i]] = self[key]
+        return groups
+
+    # ----------------------------- Time lookup ------------------------------
+
+    def _get_time_index(self):
+        """Positions of files sorted by time, and corresponding sorted times
+        (files with unknown times, i.e. NaN, are not included)"""
+        return self._get_cached('time_index', self._make_time_index)
+
+    def _make_time_index(self):
+        self.resolve_times()
+        positions = np.flatnonzero(~np.isnan(self._times))
+        order = positions[np.argsort(self._times[positions], kind='stable')]
+        return order, self._times[order]
+
+    def _nearest_positions(self, times):
+        """Positions in series of files with times closest to input times"""
+        if not len(self):
+            raise IndexError('Empty file series')
+        order, sorted_times = self._get_time_index()
+        n = len(sorted_times)
+        if n == 0:
+            raise ValueError('No file with known time in file series')
+        times = np.asarray(times, dtype=np.float64)
+        if n == 1:
+            return np.zeros(times.shape, dtype=np.intp)
+        i = np.searchsorted(sorted_times, times).clip(1, n - 1)
+        # Take file before if closer (or equally close) than file after
+        i -= (times - sorted_times[i - 1]) <= (sorted_times[i] - times)
+        return order[i]
+
+    def nearest(self, t):
+        """File with time closest to t.
+
+        Parameters
+        ----------
+        t : float
+            unix time
+
+        Returns
+        -------
+        filo.File
+        """
+        return self._make_file(int(self._nearest_positions(t)))
+
+    def nearest_many(self, times):
+        """Nums of files with times closest to each of the input times.
+
+        Parameters
+        ----------
+        times : array_like of float
+            unix times
+
+        Returns
+        -------
+        np.ndarray
+            array of nums, same shape as times.
+        """
+        return self._nums[self._nearest_positions(times)]
+
+    def between(self, t0, t1):
+        """Files with times between t0 and t1 (included).
+
+        Parameters
+        ----------
+        t0, t1 : float
+            unix times
+
+        Returns
+        -------
+        filo.FileSeries
+            sub-series (view) with files in the order of the series.
+        """
+        order, sorted_times = self._get_time_index()
+        i0 = np.searchsorted(sorted_times, t0, side='left')
+        i1 = np.searchsorted(sorted_times, t1, side='right')
+        return self[np.sort(order[i0:i1])]
+
+    def filter(self, predicate):
+        """Files for which predicate(file) is True.
+
+        Parameters
+        ----------
+        predicate : callable
+            function taking a filo.File object as input and returning a bool
+
+        Returns
+        -------
+        filo.FileSeries
+            sub-series (view) with files in the order of the series.
+        """
+        mask = np.fromiter(map(predicate, self), dtype=bool, count=len(self))
+        return self[mask]
+
     def to_csv(self, filepath, sep='\t'):
         """Save info DataFrame (see self.info property) into csv file."""
         self.info.to_csv(filepath, sep=sep)
 
+    def to_npz(self, filepath):
+        """Save file info into binary file, faster to load than CSV.
+
+        The file is a numpy .npz file (no compression) containing the columns
+        of the series; see FileSeries.from_npz() to load it back.
+        If filepath does not end with .npz, the extension is added.
+        """
+        self.resolve_times()
+        relative_folders = [
+            os.path.relpath(folder, self.refpath) for folder in self.folders
+        ]
+        np.savez(
+            filepath,
+            folders=_strings_to_bytes(relative_folders),
+            folder_idx=self._folder_idx,
+            filenames=_strings_to_bytes(self._names),
+            nums=self._nums,
+            times=self._times,
+        )
+
+    # ------------------------- Fingerprints / changes -------------------------
+
+    def fingerprints(self, content=False, max_workers=None, chunk_size=2**20):
+        """Fingerprints of files, to detect changes (see changed_since())
+
+        Parameters
+        ----------
+        content : bool, optional
+            if False (default), fingerprints are only size and modification
+            time of files (cheap, from os.stat()); if True, also add a hash
+            (BLAKE2b) of the contents of files.
+
+        max_workers : int, optional
+            number of threads used to stat / read files concurrently;
+            if None (default), use default in ThreadPoolExecutor.
+
+        chunk_size : int, optional
+            size (bytes) of chunks read at once when hashing file contents.
+
+        Returns
+        -------
+        pandas dataframe with 'num' as index and 'size', 'mtime (ns)'
+        (and 'hash' if content is True) as columns; missing files have
+        a size and mtime of -1.
+        """
+        filepaths = self._filepaths(range(len(self)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            stats = list(executor.map(_stat_fingerprint, filepaths))
+            if content:
+                hashes = list(executor.map(
+                    lambda filepath: _content_hash(filepath, chunk_size),
+                    filepaths,
+                ))
+        data = pd.DataFrame(
+            stats,
+            columns=['size', 'mtime (ns)'],
+            index=pd.Index(self._nums, name='num'),
+        )
+        if content:
+            data['hash'] = hashes
+        return data
+
+    def save_fingerprints(self, filepath, sep='\t', **kwargs):
+        """Save fingerprints of files into csv file (see fingerprints()).
+
+        Parameters
+        ----------
+        filepath : {str, pathlib.Path}
+        sep : str
+        **kwargs
+            keyword arguments passed to fingerprints()
+        """
+        self.fingerprints(**kwargs).to_csv(filepath, sep=sep)
+
+    def changed_since(self, manifest, sep='\t', max_workers=None, chunk_size=2**20):
+        """Nums of files that have changed since fingerprints were taken.
+
+        Files whose size and modification time have not changed are considered
+        unchanged without reading them. If the manifest contains content
+        hashes, the other files are hashed and only considered changed if
+        their contents differ (e.g. files re-exported with same contents).
+        Files not in the manifest are considered changed.
+
+        Parameters
+        ----------
+        manifest : {str, pathlib.Path, pandas.DataFrame}
+            fingerprints (see fingerprints()), or csv file where they have
+            been saved (see save_fingerprints()).
+
+        sep : str
+            separator used in the csv file (if manifest is a file)
+
+        max_workers, chunk_size : see fingerprints()
+
+        Returns
+        -------
+        np.ndarray
+            array of nums (in the order of the series)
+        """
+        if not isinstance(manifest, pd.DataFrame):
+            manifest = pd.read_csv(manifest, sep=sep, index_col='num')
+        old = manifest.reindex(self._nums)
+        new = self.fingerprints(max_workers=max_workers)
+
+        changed = np.array(
+            (new['size'] != old['size']) | (new['mtime (ns)'] != old['mtime (ns)']),
+            dtype=bool,
+        )
+
+        if 'hash' in old.columns:
+            positions = np.flatnonzero(changed & old['hash'].notna().to_numpy())
+            filepaths = self._filepaths(positions)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                hashes = executor.map(
+                    lambda filepath: _content_hash(filepath, chunk_size),
+                    filepaths,
+                )
+                old_hashes = old['hash'].to_numpy()[positions]
+                changed[positions] = [
+                    new_hash != old_hash
+                    for new_hash, old_hash in zip(hashes, old_hashes)
+                ]
+
+        return self._nums[changed]
+
     def update_times(self, filepath, sep='\t'):
         """Update file times using info contained in csv file.
 
         Only nums present in the csv data will be updated
         """
-        time_data = pd.read_csv(filepath, sep=sep).set_index('num')
-        for num in time_data.index:
-            self._files[num].unix_time = time_data.at[num, 'time (unix)']
+        time_data = pd.read_csv(filepath, sep=sep, usecols=['num', 'time (unix)'])
+        positions = pd.Index(self._nums).get_indexer(time_data['num'])
+        found = positions >= 0
+        self._write_times(positions[found], time_data['time (unix)'].to_numpy()[found])
 
     @property
     def duration(self):
@@ -241,6 +1308,111 @@ class FileSeries:
         ------
         datetime.Timedelta object.
         """
-        t = self.info['time (unix)']
-        dt_s = t.iloc[-1] - t.iloc[0]
+        dt_s = self._get_time(-1) - self._get_time(0)
         return datetime.timedelta(seconds=float(dt_s))
+
+
+class _DiscoveryManifest:
+    """On-disk cache of files detected in folders, used by FileSeries.auto()
+
+    Folders are stored relative to the location of the manifest file, with
+    the modification time and size of the folder when it was scanned.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = Path(filepath)
+        self.modified = False
+        try:
+            data = load_json(self.filepath)
+        except (FileNotFoundError, ValueError):
+            data = {}
+        # Keys are absolute paths in memory, relative to manifest in file
+        self.folders = {
+            self._abspath(self.filepath.parent / foldername): info
+            for foldername, info in data.items()
+        }
+
+    @staticmethod
+    def _abspath(folder):
+        return os.path.normpath(os.path.abspath(folder))
+
+    def get(self, folder, stat, extension):
+        """(names, times) of files in folder if still valid, else None."""
+        info = self.folders.get(self._abspath(folder))
+        if info is None:
+            return None
+        valid = (
+            info['mtime'] == stat.st_mtime_ns
+            and info['size'] == stat.st_size
+            and info['extension'] == self._extension(extension)
+        )
+        return (info['names'], info['times']) if valid else None
+
+    def set(self, folder, stat, extension, names, times):
+        """Store info of scanned folder."""
+        self.folders[self._abspath(folder)] = {
+            'mtime': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'extension': self._extension(extension),
+            'names': names,
+            'times': times,
+        }
+        self.modified = True
+
+    @staticmethod
+    def _extension(extension):
+        """Extension(s) in the format they are stored in the JSON file"""
+        return extension if isinstance(extension, str) else list(extension)
+
+    def save(self):
+        """Save manifest to file if it has been modified."""
+        if not self.modified:
+            return
+        data = {
+            os.path.relpath(folder, self._abspath(self.filepath.parent)): info
+            for folder, info in self.folders.items()
+        }
+        # Write in temporary file first, to not leave corrupted manifests
+        tmp_filepath = self.filepath.with_name(self.filepath.name + '.tmp')
+        to_json(data, tmp_filepath)
+        os.replace(tmp_filepath, self.filepath)
+        self.modified = False
+
+
+# ================================ Misc tools ================================
+
+
+def _stat_fingerprint(filepath):
+    """(size, mtime in ns) of file, (-1, -1) if file does not exist."""
+    try:
+        stat = os.stat(filepath)
+    except FileNotFoundError:
+        return -1, -1
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _content_hash(filepath, chunk_size=2**20):
+    """Hash (hex str) of file contents, read by chunks; None if no file."""
+    file_hash = hashlib.blake2b(digest_size=16)
+    try:
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                file_hash.update(chunk)
+    except FileNotFoundError:
+        return None
+    return file_hash.hexdigest()
+
+
+def _strings_to_bytes(strings):
+    """Store strings (e.g. filenames) in a single uint8 array.
+
+    Strings are separated by null characters, which cannot appear in paths.
+    """
+    return np.frombuffer('\0'.join(strings).encode('utf8'), dtype=np.uint8)
+
+
+def _bytes_to_strings(array):
+    """Inverse of _strings_to_bytes(); returns list of str."""
+    if not array.size:
+        return []
+    return array.tobytes().decode('utf8').split('\0')
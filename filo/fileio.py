@@ -1,6 +1,14 @@
 """File Management."""
 
+import os
 import json
+import mmap
+import time
+import struct
+import zipfile
+from itertools import islice
+
+import numpy as np
 
 # ================== Functions for json saving and reading ===================
 
@@ -58,6 +66,132 @@ def line_to_data(line, sep='\t', dtype=float):
     return tuple(data_list)
 
 
+class TabularWriter:
+    """Buffered writer of rows of data into a text file (e.g. .tsv), for
+    high-rate logging.
+
+    The file is opened once in append mode; rows are formatted exactly as
+    with data_to_line(), stored in memory and written to the file by batches,
+    when the buffer is full or after some time (see flush_interval).
+
+    Examples
+    --------
+    >>> with TabularWriter('data.tsv', header=('time (unix)', 'p (Pa)')) as w:
+    >>>     for ...:
+    >>>         w.write_row((time.time(), p))
+    """
+
+    def __init__(
+        self,
+        filepath,
+        sep='\t',
+        header=None,
+        buffer_size=1000,
+        flush_interval=None,
+    ):
+        """Open file for writing.
+
+        Parameters
+        ----------
+        filepath : str or pathlib.Path
+
+        sep : str
+            separator between columns
+
+        header : iterable of str, optional
+            column names, written as first line if file is new or empty.
+
+        buffer_size : int
+            number of rows kept in memory before writing them to the file.
+
+        flush_interval : float, optional
+            if not None, also write rows to file when this time (s) has
+            elapsed since the last write (checked when writing rows).
+        """
+        self.filepath = filepath
+        self.sep = sep
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+
+        self._buffer = []
+        self._nrows = 0  # number of rows in buffer
+        self._last_flush = time.monotonic()
+
+        new_file = not os.path.exists(filepath) or not os.path.getsize(filepath)
+        self._file = open(filepath, 'a', encoding='utf8')
+        if header is not None and new_file:
+            self._file.write(data_to_line(header, sep=sep))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        return self._file.closed
+
+    def write_row(self, data):
+        """Add a row (iterable of values) to be written in the file."""
+        self._buffer.append(data_to_line(data, sep=self.sep))
+        self._nrows += 1
+        self._check_flush()
+
+    def write_rows(self, rows):
+        """Add several rows to be written in the file.
+
+        Parameters
+        ----------
+        rows : iterable of iterables, or 2D numpy array
+            if a numpy array of floats (double precision), ints or bools,
+            rows are formatted in bulk.
+        """
+        if isinstance(rows, np.ndarray) and rows.ndim == 2 and _bulk_formattable(rows):
+            # Conversion to python scalars gives the same str() as data_to_line
+            sep = self.sep
+            lines = [sep.join(map(str, row)) for row in rows.tolist()]
+            if lines:
+                self._buffer.append('\n'.join(lines) + '\n')
+            self._nrows += len(lines)
+        else:
+            for data in rows:
+                self._buffer.append(data_to_line(data, sep=self.sep))
+                self._nrows += 1
+        self._check_flush()
+
+    def _check_flush(self):
+        if self._nrows >= self.buffer_size:
+            self.flush()
+        elif self.flush_interval is not None:
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def flush(self):
+        """Write buffered rows to file."""
+        if self._buffer:
+            self._file.write(''.join(self._buffer))
+            self._buffer = []
+            self._nrows = 0
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        """Write remaining rows and close file."""
+        if self.closed:
+            return
+        try:
+            self.flush()
+        finally:
+            self._file.close()
+
+
+def _bulk_formattable(array):
+    """Whether str() of python scalars from array.tolist() equals str() of
+    the numpy scalars (not the case e.g. for float32 arrays)"""
+    return array.dtype.kind in 'iub' or array.dtype == np.float64
+
+
 def load_csv(filepath, sep=',', skiprows=0):
     """Load csv file into a list of lists, similar to numpy.genfromtxt()
 
@@ -75,3 +209,347 @@ def load_csv(filepath, sep=',', skiprows=0):
             data_raw = line.split(sep)
             data.append([x.strip() for x in data_raw])
     return data
+
+
+def iter_csv(filepath, sep=',', skiprows=0, dtype=float, chunksize=10000):
+    """Read csv file by chunks of rows, returned as typed numpy arrays.
+
+    Only chunksize rows are in memory at a time, and each chunk is parsed
+    in bulk by numpy's (compiled) parser instead of field by field.
+
+    Parameters
+    ----------
+    filepath : str or pathlib.Path
+    sep : str
+    skiprows : int
+        number of lines to skip at the beginning of the file (e.g. header)
+
+    dtype : type, iterable or dict
+        - single type (e.g. float, default): all columns have this type and
+          chunks are 2D arrays,
+        - iterable of types, one per column (e.g. (float, int, str)) or
+          dict {column name: type}: chunks are structured arrays (1D);
+          str columns are stripped of surrounding whitespace.
+
+    chunksize : int
+        number of rows per chunk
+
+    Yields
+    ------
+    np.ndarray
+    """
+    dtype = _csv_dtype(dtype)
+    with open(filepath, 'r') as f:
+        for _ in islice(f, skiprows):
+            pass
+        while True:
+            lines = list(islice(f, chunksize))
+            if not lines:
+                return
+            yield _parse_csv_lines(lines, sep=sep, dtype=dtype)
+
+
+def load_csv_array(filepath, sep=',', skiprows=0, dtype=float):
+    """Load whole csv file into a typed numpy array (see iter_csv()).
+
+    Faster alternative to load_csv() for numeric data: the whole file is
+    parsed in bulk by numpy's (compiled) parser.
+    """
+    dtype = _csv_dtype(dtype)
+    return _parse_csv_lines(filepath, sep=sep, dtype=dtype, skiprows=skiprows)
+
+
+def _csv_dtype(dtype):
+    """numpy dtype from dtype specification (see iter_csv())"""
+    if isinstance(dtype, dict):
+        fields = list(dtype.items())
+    elif isinstance(dtype, (list, tuple)):
+        fields = [(f'f{i}', column_type) for i, column_type in enumerate(dtype)]
+    else:
+        return np.dtype(dtype)
+    return np.dtype([
+        (name, object if column_type is str else column_type)
+        for name, column_type in fields
+    ])
+
+
+def _parse_csv_lines(lines, sep, dtype, skiprows=0):
+    """Parse lines (or file) with numpy and strip string columns."""
+    ndmin = 1 if dtype.names else 2
+    data = np.loadtxt(
+        lines,
+        delimiter=sep,
+        dtype=dtype,
+        comments=None,  # e.g. '#' in filenames
+        skiprows=skiprows,
+        ndmin=ndmin,
+    )
+    for name in dtype.names or ():
+        if dtype[name].kind in 'OU':
+            data[name] = np.char.strip(data[name].astype(str))
+    return data
+
+
+class LineIndex:
+    """Index of the positions of lines in a (large) text/csv file.
+
+    The index is built once (by scanning the file for newlines) and saved
+    next to the file as a .npz file, which is reused as long as the
+    size and modification time of the file do not change. Rows are then read
+    through a memory map of the file, so that getting a range of rows only
+    reads these rows from disk, whatever the size of the file.
+
+    Optionally, a time column (sorted) is also stored in the index, to find
+    rows in a time interval by bisection.
+
+    Examples
+    --------
+    >>> with LineIndex('data.tsv', sep='\t', skiprows=1, time_column=0) as index:
+    >>>     len(index)                    # number of data rows
+    >>>     index.read(1000, 1010)        # 2D array of rows 1000 to 1009
+    >>>     index.between(t0, t1)         # rows with t0 <= time <= t1
+    """
+
+    def __init__(
+        self,
+        filepath,
+        sep=',',
+        skiprows=0,
+        time_column=None,
+        index_file=None,
+        persist=True,
+    ):
+        """Load (or build) index of file.
+
+        Parameters
+        ----------
+        filepath : str or pathlib.Path
+
+        sep : str
+            column separator
+
+        skiprows : int
+            number of lines to skip at the beginning of the file (e.g. header)
+
+        time_column : int, optional
+            if not None, position of a column containing times (float,
+            sorted in increasing order), to find rows by time with between().
+
+        index_file : str or pathlib.Path, optional
+            where to save the index; if None (default), same path as the
+            file with '.index.npz' appended to its name.
+
+        persist : bool
+            if True (default), save index to index_file and reuse it if it
+            is valid.
+        """
+        self.filepath = filepath
+        self.sep = sep
+        self.skiprows = skiprows
+        self.time_column = time_column
+        if index_file is None:
+            index_file = os.fspath(filepath) + '.index.npz'
+        self.index_file = index_file
+
+        stat = os.stat(filepath)
+        # Index is valid only for same file and same index parameters
+        column = -1 if time_column is None else time_column
+        self._signature = np.array(
+            [stat.st_size, stat.st_mtime_ns, skiprows, column],
+            dtype=np.int64,
+        )
+
+        data = self._load_index() if persist else None
+        if data is None:
+            data = self._build_index()
+            if persist:
+                self._save_index(data)
+        self.offsets = data['offsets']
+        self.times = data.get('times')
+
+        self._file = open(filepath, 'rb')
+        # Empty files cannot be memory-mapped
+        if stat.st_size:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._mmap = b''
+
+    def __repr__(self):
+        return f"{self.__class__.__name__} of {self.filepath}, {len(self)} rows"
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+        self._file.close()
+
+    # ---------------------------- Index creation ----------------------------
+
+    def _build_index(self, chunk_size=2**24):
+        """Find positions of line starts by scanning file by chunks."""
+        positions = [np.zeros(1, dtype=np.int64)]
+        size = 0
+        with open(self.filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                newlines = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) == 10)
+                positions.append(newlines + size + 1)
+                size += len(chunk)
+        offsets = np.concatenate(positions).astype(np.int64)
+        if offsets[-1] != size:  # last line without newline character
+            offsets = np.append(offsets, size)
+        # Offsets are start positions of rows, plus end of last row
+        data = {'offsets': offsets[self.skiprows:]}
+
+        if self.time_column is not None:
+            times = np.loadtxt(
+                self.filepath,
+                delimiter=self.sep,
+                skiprows=self.skiprows,
+                usecols=self.time_column,
+                dtype=np.float64,
+                comments=None,
+                ndmin=1,
+            )
+            if len(times) != len(data['offsets']) - 1:
+                raise ValueError('Empty lines in file, cannot index time column.')
+            if np.any(np.diff(times) < 0):
+                raise ValueError('Time column is not sorted.')
+            data['times'] = times
+
+        return data
+
+    def _load_index(self):
+        """Load index from index file if it exists and matches current file."""
+        try:
+            data = load_npz(self.index_file, mmap_keys=('offsets', 'times'))
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return None
+        signature = data.pop('signature', None)
+        if signature is None or not np.array_equal(signature, self._signature):
+            return None
+        return data
+
+    def _save_index(self, data):
+        """Save index (uncompressed, to be memory-mapped) atomically."""
+        tmp_file = os.fspath(self.index_file) + '.tmp'
+        with open(tmp_file, 'wb') as f:
+            np.savez(f, signature=self._signature, **data)
+        os.replace(tmp_file, self.index_file)
+
+    # ============================ Public methods ============================
+
+    def lines(self, start, stop):
+        """Lines (str, without newline characters) of rows start to stop-1."""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if stop <= start:
+            return []
+        text = self._mmap[self.offsets[start]:self.offsets[stop]].decode('utf8')
+        # Only '\n' delimits rows (consistent with offsets), not e.g. '\x0c'
+        lines = text.split('\n')
+        if text.endswith('\n'):
+            lines.pop()
+        return [line[:-1] if line.endswith('\r') else line for line in lines]
+
+    def read(self, start, stop, dtype=float):
+        """Rows start to stop-1 as a typed numpy array.
+
+        dtype: see iter_csv()
+        """
+        dtype = _csv_dtype(dtype)
+        lines = self.lines(start, stop)
+        if not lines:
+            return np.empty((0, 0) if dtype.names is None else 0, dtype=dtype)
+        return _parse_csv_lines(lines, sep=self.sep, dtype=dtype)
+
+    def locate(self, t0=None, t1=None):
+        """Range (start, stop) of rows with t0 <= time <= t1 (bisection)."""
+        if self.times is None:
+            raise ValueError('No time column in index (see time_column).')
+        start = 0 if t0 is None else np.searchsorted(self.times, t0, side='left')
+        stop = len(self) if t1 is None else np.searchsorted(self.times, t1, side='right')
+        return int(start), int(stop)
+
+    def between(self, t0=None, t1=None, dtype=float):
+        """Rows with t0 <= time <= t1 as a typed numpy array (see read())."""
+        start, stop = self.locate(t0, t1)
+        return self.read(start, stop, dtype=dtype)
+
+
+# =================== Functions for npz saving and reading ===================
+
+
+def load_npz(filepath, mmap_keys=()):
+    """Load arrays from npz file (see numpy.savez()) into a dict.
+
+    Contrary to numpy.load(), arrays can be memory-mapped: data is then only
+    read from disk when accessed, which is much faster for large arrays.
+    Memory-mapped arrays are copy-on-write, i.e. they can be modified in
+    memory but changes are not written to the file.
+
+    Parameters
+    ----------
+    filepath : str or pathlib.Path
+
+    mmap_keys : iterable of str
+        names of arrays to memory-map (only possible if the file has not been
+        saved with compression, and for non-object arrays; if not possible,
+        arrays are loaded in memory normally)
+
+    Returns
+    -------
+    dict
+        {name: array}
+    """
+    data = {}
+    with zipfile.ZipFile(filepath) as zf, open(filepath, 'rb') as f:
+        for info in zf.infolist():
+            key = info.filename[:-len('.npy')]
+            array = None
+            if key in mmap_keys and info.compress_type == zipfile.ZIP_STORED:
+                array = _mmap_npy_member(filepath, f, info)
+            if array is None:
+                with zf.open(info) as member:
+                    array = np.lib.format.read_array(member)
+            data[key] = array
+    return data
+
+
+def _mmap_npy_member(filepath, f, info):
+    """Memory-map .npy array stored without compression in a zip file.
+
+    Returns None if the array cannot be memory-mapped.
+    """
+    # Data starts after local file header (fixed size of 30 bytes + variable
+    # filename and extra field, whose lengths are stored in the header)
+    f.seek(info.header_offset + 26)
+    name_length, extra_length = struct.unpack('<HH', f.read(4))
+    f.seek(info.header_offset + 30 + name_length + extra_length)
+
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        header = np.lib.format.read_array_header_1_0(f)
+    elif version == (2, 0):
+        header = np.lib.format.read_array_header_2_0(f)
+    else:
+        return None
+    shape, fortran_order, dtype = header
+
+    if dtype.hasobject or not np.prod(shape):
+        return None
+
+    return np.memmap(
+        filepath,
+        dtype=dtype,
+        mode='c',
+        offset=f.tell(),
+        shape=shape,
+        order='F' if fortran_order else 'C',
+    )
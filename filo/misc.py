@@ -1,8 +1,18 @@
 """File Management."""
 
 
+import os
+import re
+import json
+import errno
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from fnmatch import translate
 from pathlib import Path
 
+from tqdm import tqdm
+
 
 # ========================== Basic File Management ===========================
 
@@ -11,14 +21,224 @@ def list_files(path='.', extension=''):
     """Return list of files with specific extension in path.
 
     - by default, return all files with any extension.
+    - extension can also be an iterable of extensions, e.g. ('.png', '.tif')
     - directories are excluded
     - results are sorted by name
     """
-    folder = Path(path)
-    pattern = '*' + extension
-    paths = folder.glob(pattern)
-    filepaths = [p for p in paths if p.is_file()]
-    return sorted(filepaths)
+    return [Path(entry.path) for entry in scan_files(path, extension)]
+
+
+def scan_files(path='.', extension=''):
+    """Return list of os.DirEntry objects of files with extension in path.
+
+    Same selection and ordering as list_files(), but done in a single
+    os.scandir() pass. The returned entries cache their file type and stat
+    results, so that e.g. getting modification times with entry.stat()
+    costs at most one system call per file.
+    """
+    files = _iter_entries(path, _extension_matcher(extension))
+    return sorted(files, key=lambda entry: entry.name)
+
+
+def iter_files(path='.', extension='', pattern=None, sort=None):
+    """Iterate over files in path, streamed from a single os.scandir() pass.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+
+    extension : str or iterable of str
+        extension(s) of files to consider, e.g. ('.png', '.tif');
+        by default, all files.
+
+    pattern : str or iterable of str, optional
+        glob pattern(s) on filenames, e.g. ('img-*.png', 'ref.tif');
+        if provided, extension is not considered.
+
+    sort : {None, 'name', 'natural'}, optional
+        - None (default): files are yielded in the (arbitrary) order of the
+          directory listing, without holding the listing in memory,
+        - 'name': sorted by name as in list_files(),
+        - 'natural': sorted by name but with numbers in names compared as
+          numbers (e.g. 'img-9.png' before 'img-10.png').
+
+    Yields
+    ------
+    pathlib.Path
+    """
+    if pattern is None:
+        match = _extension_matcher(extension)
+    else:
+        match = _pattern_matcher(pattern)
+    entries = _iter_entries(path, match)
+    if sort == 'name':
+        entries = sorted(entries, key=lambda entry: entry.name)
+    elif sort == 'natural':
+        entries = sorted(entries, key=lambda entry: natural_key(entry.name))
+    elif sort is not None:
+        raise ValueError(f"sort must be None, 'name' or 'natural', not {sort!r}")
+    for entry in entries:
+        yield Path(entry.path)
+
+
+def natural_key(name):
+    """Key to sort names with numbers compared as numbers ('a9' < 'a10')"""
+    parts = _NUMBERS.split(name)
+    parts[1::2] = map(int, parts[1::2])  # split puts numbers at odd positions
+    return parts
+
+
+_NUMBERS = re.compile(r'(\d+)')
+
+
+def _iter_entries(path, match):
+    """Iterate over os.DirEntry objects of files in path with name matching
+    (nothing if path does not exist, as with Path.glob())"""
+    try:
+        entries = os.scandir(path)
+    except (FileNotFoundError, NotADirectoryError):
+        return
+    with entries:
+        for entry in entries:
+            if match(entry.name) and entry.is_file():
+                yield entry
+
+
+def scan_tree(path='.', extension='', include=None, exclude=None, max_workers=None):
+    """Find files with extension in path and all its subfolders.
+
+    Folders are listed concurrently (os.scandir() in a thread pool), which
+    is much faster than one after the other on high-latency filesystems
+    (e.g. network drives). Symbolic links to folders are not followed.
+
+    Parameters
+    ----------
+    path : str or pathlib.Path
+        root folder
+
+    extension : str or iterable of str
+        (see list_files())
+
+    include, exclude : str or iterable of str, optional
+        glob patterns (e.g. 'day*/*.png') matched against paths relative to
+        root folder, with '/' as separator. Only files matching one of the
+        include patterns (if provided) and none of the exclude patterns are
+        considered. Subfolders matching an exclude pattern are not explored.
+
+    max_workers : int, optional
+        number of threads; if None (default), use default
+        in ThreadPoolExecutor.
+
+    Returns
+    -------
+    dict
+        {folder (pathlib.Path): list of os.DirEntry objects of files}
+        with files sorted by name, and folders sorted by name, subfolders
+        being listed after their parent folder (folders without files
+        are excluded).
+    """
+    root = Path(path)
+    results = _scan_tree(root, extension, include, exclude, max_workers)
+    # Sorting tuples of folder parts puts subfolders right after their parent
+    return {
+        root.joinpath(*relfolder): results[relfolder][1]
+        for relfolder in sorted(results) if results[relfolder][1]
+    }
+
+
+def _scan_tree(
+    root,
+    extension='',
+    include=None,
+    exclude=None,
+    max_workers=None,
+    start=((),),
+    known=(),
+):
+    """Scan folders concurrently (see scan_tree()).
+
+    Parameters
+    ----------
+    root : pathlib.Path
+
+    extension, include, exclude, max_workers : see scan_tree()
+
+    start : iterable of tuples
+        folders from which to start the scan, as tuples of their parts
+        relative to root (default: root only)
+
+    known : container of tuples
+        subfolders (same format) that are not explored when found
+
+    Returns
+    -------
+    dict
+        {relative folder (tuple): (mtime, entries)} for all scanned
+        folders, with mtime the modification time (ns) of the folder just
+        before it was listed, and entries the list of os.DirEntry objects of
+        files, sorted by name. Folders that do not exist (e.g. missing root)
+        are not included.
+    """
+    match = _extension_matcher(extension)
+    match_include = _pattern_matcher(include) if include else None
+    match_exclude = _pattern_matcher(exclude) if exclude else None
+
+    def scan(relfolder):
+        """Scan folder defined by the tuple of its parts relative to root"""
+        files, subfolders = [], []
+        folder = root.joinpath(*relfolder)
+        try:
+            # stat before scan, so that files added during scan are not missed
+            mtime = os.stat(folder).st_mtime_ns
+            entries = os.scandir(folder)
+        except (FileNotFoundError, NotADirectoryError):  # e.g. deleted folder
+            return relfolder, None, files, subfolders
+        with entries:
+            for entry in entries:
+                relpath = '/'.join(relfolder + (entry.name,))
+                if match_exclude is not None and match_exclude(relpath):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    subfolder = relfolder + (entry.name,)
+                    if subfolder not in known:
+                        subfolders.append(subfolder)
+                elif match(entry.name) and entry.is_file():
+                    if match_include is None or match_include(relpath):
+                        files.append(entry)
+        files.sort(key=lambda entry: entry.name)
+        return relfolder, mtime, files, subfolders
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(scan, relfolder) for relfolder in start}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                relfolder, mtime, files, subfolders = future.result()
+                if mtime is not None:
+                    results[relfolder] = mtime, files
+                pending.update(executor.submit(scan, sub) for sub in subfolders)
+    return results
+
+
+def _pattern_matcher(patterns):
+    """Function that checks if a name matches any of the glob patterns.
+
+    Matching is similar to fnmatch.fnmatch(), but with a single
+    precompiled regular expression for all patterns.
+    """
+    if isinstance(patterns, str):
+        patterns = patterns,
+    regex = '|'.join(translate(os.path.normcase(pattern)) for pattern in patterns)
+    match = re.compile(regex).match
+    return lambda name: match(os.path.normcase(name)) is not None
+
+
+def _extension_matcher(extension):
+    """Function that checks if a filename ends with (one of) extension(s)"""
+    if isinstance(extension, str):
+        extension = extension,
+    return _pattern_matcher(['*' + ext for ext in extension])
 
 
 def list_all(path='.'):
@@ -28,40 +248,47 @@ def list_all(path='.'):
     return sorted(contents)
 
 
-def move_files(src='.', dst='.', extension=''):
+def move_files(src='.', dst='.', extension='', **kwargs):
     """Move all files with a certain extension from folder 1 to folder 2.
 
     - directories are excluded
     - directory dst is created if not already existing
+    - kwargs are passed to bulk_move() (max_workers, dry_run, journal, progress)
+    - returns list of (source, destination) moves (see bulk_move())
     """
     p1, p2 = Path(src), Path(dst)
-    filepaths = list_files(p1, extension)
-    p2.mkdir(exist_ok=True)
-    for filepath in filepaths:
-        newfilepath = p2 / filepath.name
-        filepath.rename(newfilepath)
+    moves = [(filepath, p2 / filepath.name) for filepath in list_files(p1, extension)]
+    if not kwargs.get('dry_run', False):
+        p2.mkdir(exist_ok=True)
+    return bulk_move(moves, **kwargs)
 
 
-def move_all(src='.', dst='.'):
+def move_all(src='.', dst='.', **kwargs):
     """Move all contents of folder 1 into folder 2.
 
-    directory dst is created if not already existing
+    - directory dst is created if not already existing
+    - kwargs are passed to bulk_move() (max_workers, dry_run, journal, progress)
+    - returns list of (source, destination) moves (see bulk_move())
     """
     p1, p2 = Path(src), Path(dst)
-    p2.mkdir(exist_ok=True)
-    contents = p1.glob('*')  # I do not use list_all to keep a generator
-    for content in contents:
-        new_content = p2 / content.name
-        content.rename(new_content)
+    moves = [(content, p2 / content.name) for content in p1.glob('*')]
+    if not kwargs.get('dry_run', False):
+        p2.mkdir(exist_ok=True)
+    return bulk_move(moves, **kwargs)
 
 
-def batch_file_rename(name, newname, path='.'):
+def batch_file_rename(name, newname, path='.', **kwargs):
     """Change name to newname for all files in path and subdirectories.
 
     Parameters
     ----------
     name, newname: str
     path: str or path object
+    **kwargs: passed to bulk_move() (max_workers, dry_run, journal, progress)
+
+    Returns
+    -------
+    list of (source, destination) moves (see bulk_move())
 
     Example
     -------
@@ -72,15 +299,134 @@ def batch_file_rename(name, newname, path='.'):
     Notes
     -----
     - IMPORTANT: before running this function, check all files that will be
-    impacted by running list(Path(path).glob(f'**/{name}')).
+    impacted by running it with dry_run=True.
     - modification, creation dates etc. not changed in the process.
     """
     folder = Path(path)
     filepaths = folder.glob(f'**/{name}')
+    moves = [(filepath, filepath.with_name(newname)) for filepath in filepaths]
+    return bulk_move(moves, **kwargs)
+
+
+def bulk_move(moves, max_workers=None, dry_run=False, journal=None, progress=False):
+    """Move/rename many files or folders concurrently.
+
+    Moves are done with a rename when possible; when source and destination
+    are on different filesystems, a streamed copy followed by a deletion of
+    the source is done instead (see shutil.move()).
+
+    Parameters
+    ----------
+    moves : iterable of tuples
+        (source, destination) pairs of paths (str or pathlib.Path)
+
+    max_workers : int, optional
+        number of threads; if None (default), use default
+        in ThreadPoolExecutor.
+
+    dry_run : bool, optional
+        if True, do not move anything, just return the moves (plan) that
+        would be done.
+
+    journal : {str, pathlib.Path}, optional
+        file in which every completed move is recorded; if the file already
+        exists (e.g. interrupted operation), moves already recorded in it
+        are skipped, which allows resuming. Moves can be reverted with
+        undo_moves(journal).
+
+    progress : bool, optional
+        if True, show progress bar.
+
+    Returns
+    -------
+    list
+        list of (source, destination) moves, as pathlib.Path objects
+        (excluding moves that were already done according to the journal).
+    """
+    moves = [(Path(src), Path(dst)) for src, dst in moves]
+
+    if journal is not None:
+        done = set(_read_journal(journal))
+        moves = [move for move in moves if move not in done]
+
+    if dry_run:
+        return moves
+
+    journal_file = None if journal is None else open(journal, 'a', encoding='utf8')
+    lock = threading.Lock()
+
+    def move_and_record(move):
+        src, dst = move
+        if src.exists() or not dst.exists():  # else: moved but not recorded
+            _move(src, dst)
+        if journal_file is not None:
+            with lock:
+                journal_file.write(json.dumps([str(src), str(dst)]) + '\n')
+                journal_file.flush()
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(move_and_record, moves)
+            for _ in tqdm(results, total=len(moves), disable=not progress):
+                pass
+    finally:
+        if journal_file is not None:
+            journal_file.close()
+
+    return moves
+
 
-    for filepath in filepaths:
-        newfilepath = filepath.with_name(newname)
-        filepath.rename(newfilepath)
+def undo_moves(journal, max_workers=None, progress=False):
+    """Revert moves recorded in journal file by bulk_move().
+
+    Moves that have already been reverted are skipped, so that the operation
+    can be resumed if interrupted. The journal file is deleted at the end.
+
+    Parameters
+    ----------
+    journal : {str, pathlib.Path}
+        journal file (see bulk_move())
+
+    max_workers, progress : see bulk_move()
+
+    Returns
+    -------
+    list
+        list of (source, destination) moves done to revert the journal.
+    """
+    moves = [
+        (dst, src) for src, dst in reversed(_read_journal(journal))
+        if dst.exists()
+    ]
+    bulk_move(moves, max_workers=max_workers, progress=progress)
+    Path(journal).unlink()
+    return moves
+
+
+def _move(src, dst):
+    """Rename, or copy and delete if src and dst are on different filesystems"""
+    try:
+        os.rename(src, dst)
+    except OSError as error:
+        if error.errno != errno.EXDEV:
+            raise
+        shutil.move(src, dst)
+
+
+def _read_journal(journal):
+    """List of (source, destination) moves recorded in journal file"""
+    moves = []
+    try:
+        with open(journal, 'r', encoding='utf8') as f:
+            for line in f:
+                try:
+                    src, dst = json.loads(line)
+                except ValueError:  # e.g. incomplete line after interruption
+                    continue
+                moves.append((Path(src), Path(dst)))
+    except FileNotFoundError:
+        pass
+    return moves
 
 
 # ================================== MISC. ===================================
@@ -1,7 +1,11 @@
 """Base classes for display / transform / analysis parameters"""
 
+import json
+import hashlib
 from abc import ABC, abstractmethod
 
+import numpy as np
+
 
 class ParameterBase(ABC):
     """Base class to define common methods for different parameters."""
@@ -32,6 +36,15 @@ class ParameterBase(ABC):
     def is_active(self):
         return not self.is_empty
 
+    @property
+    def state(self):
+        """Hashable representation of the parameter data (str).
+
+        Used e.g. as key to cache results of transforms; redefine in
+        subclasses if parameters depend on more than self.data.
+        """
+        return json.dumps(self.data, sort_keys=True, default=_state_default)
+
     # ============================= To subclass ==============================
 
     @property
@@ -46,6 +59,10 @@ class TransformParameterBase(ParameterBase):
 
     These parameters DO impact analysis and are stored in metadata.
     """
+    # Define as True in subclasses if apply() also works on a stack of data
+    # (first axis = data num), which is faster in DataSeries.read_many()
+    stackable = False
+
     @property
     def order(self):
         # Order in which transform is applied if several transforms defined
@@ -60,7 +77,8 @@ class TransformParameterBase(ParameterBase):
     def _update_others(self):
         """What to do to all other parameters and caches when the current
         parameter is updated"""
-        self.data_series.clear_cache('transforms')
+        # Cached results of transforms before this one are still valid
+        self.data_series.clear_cache('transforms', start=self.name)
         for transform_name in self.data_series.active_transforms:
             transform = getattr(self.data_series, transform_name)
             if not transform.is_empty and self.order < transform.order:
@@ -119,4 +137,21 @@ class CorrectionParameterBase(ParameterBase):
         Any
             the processed data
         """
-        pass
\ No newline at end of file
+        pass
+
+
+# ================================ Misc tools ================================
+
+
+def _state_default(value):
+    """JSON representation of values not serializable by json (see state).
+
+    Numpy arrays are represented by a hash of their contents, because repr()
+    truncates large arrays (different arrays would have the same state).
+    """
+    if isinstance(value, np.ndarray):
+        if value.dtype.hasobject:
+            return value.tolist()
+        contents = hashlib.blake2b(np.ascontiguousarray(value).tobytes(), digest_size=16)
+        return f'ndarray({value.shape}, {value.dtype.str}, {contents.hexdigest()})'
+    return repr(value)
@@ -2,8 +2,23 @@
 
 # Standard library
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 
+# Non-standard
+import numpy as np
+
+# Local imports
+from .cache import MemoryCache, SharedMemoryCache, Prefetcher
+
+
+_MISSING = object()
+
+# Attributes replaced or created by caching, see DataSeriesReaderBase._init_cache()
+_CACHE_ATTRIBUTES = (
+    '_read', 'read', 'cached_methods', 'memory_cache', 'stage_cache', 'prefetcher',
+)
+
 
 class DataSeriesReaderBase(ABC):
     """Base class for reading data from series of files and applying modifications
@@ -19,6 +34,12 @@ class DataSeriesReaderBase(ABC):
         cache=False,
         read_cache_size=128,
         transform_cache_size=128,
+        cache_max_bytes=None,
+        cache_min_available=None,
+        cache_stages=False,
+        prefetch=0,
+        prefetch_workers=None,
+        cache_shared=False,
     ):
         """Init DataSeriesReader object
 
@@ -42,19 +63,139 @@ class DataSeriesReaderBase(ABC):
         transform_cache_size : int, optional
             The calculation from loaded data into transformed data can also be
             cached : see file_cache_size
+
+        cache_max_bytes : int or str, optional
+            if not None, limit the cache by memory size instead of number of
+            entries, e.g. cache_max_bytes='2GB' (read_cache_size and
+            transform_cache_size are then ignored); read and transformed
+            data share this memory budget, least recently used data being
+            evicted first (see filo.cache.MemoryCache).
+
+        cache_min_available : int or str, optional
+            if not None (and cache_max_bytes is not None), also evict data
+            from the cache when the memory available on the system falls
+            below this value, e.g. '1GB' (Linux only).
+
+        cache_stages : bool, optional
+            if True (and cache=True), also cache the intermediate results
+            of every transform, keyed by the parameters of the transforms up
+            to this one; when a transform is modified (e.g. during
+            interactive tuning), only this transform and the subsequent ones
+            are re-calculated. Intermediate results share the memory budget
+            if cache_max_bytes is set, else are limited in number by
+            transform_cache_size.
+
+        prefetch : int, optional
+            if > 0 (requires cache=True), when data is read with a regular
+            step between nums (e.g. 0, 1, 2 or 10, 8, 6), read and transform
+            up to this number of next data in the same direction in
+            background threads, so that they are already in the cache when
+            requested (_read() and transforms must then be thread-safe).
+
+        prefetch_workers : int, optional
+            number of threads used for prefetching; if None (default),
+            use default in ThreadPoolExecutor.
+
+        cache_shared : bool, optional
+            if True (and cache=True), read data (e.g. decoded frames, numpy
+            arrays) are cached in shared memory instead of in the memory of
+            the current process: the cache is then common to the current
+            process and to the worker processes of parallel analyses, which
+            get read-only, zero-copy views of the data. The shared cache is
+            limited by cache_max_bytes if set, else in number by
+            read_cache_size (oldest data evicted first); transforms are
+            still cached in every process separately. Requires Python >= 3.8.
+            (see filo.cache.SharedMemoryCache)
         """
         self.data_series = data_series
         self.cache = cache
 
-        if self.cache:
-            self._read = lru_cache(maxsize=read_cache_size)(self._read)
-            self.read = lru_cache(maxsize=transform_cache_size)(self.read)
-            self.cached_methods = {
-                'files': self._read,
-                'transforms': self.read,
-            }
+        if prefetch and not self.cache:
+            raise ValueError('Prefetching requires cache=True.')
+
+        if self.cache and cache_shared:
+            self.shared_cache = SharedMemoryCache(
+                max_bytes=cache_max_bytes,
+                max_entries=None if cache_max_bytes is not None else read_cache_size,
+            )
         else:
-            self.cached_methods = {}
+            self.shared_cache = None
+
+        self.cache_options = {
+            'read_cache_size': read_cache_size,
+            'transform_cache_size': transform_cache_size,
+            'cache_max_bytes': cache_max_bytes,
+            'cache_min_available': cache_min_available,
+            'cache_stages': cache_stages,
+            'prefetch': prefetch,
+            'prefetch_workers': prefetch_workers,
+        }
+        self._init_cache()
+
+    def __getstate__(self):
+        # Cached methods and threads cannot be pickled (e.g. to send reader
+        # to other processes): caches are re-created empty when unpickling,
+        # except the shared cache, whose contents are common to all processes
+        state = self.__dict__.copy()
+        for name in _CACHE_ATTRIBUTES:
+            state.pop(name, None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_cache()
+
+    def _init_cache(self):
+        """Replace _read() and read() by cached versions (see __init__)"""
+        for name in _CACHE_ATTRIBUTES:
+            self.__dict__.pop(name, None)  # back to non-cached methods
+        self.cached_methods = {}
+        self.memory_cache = None
+        self.stage_cache = None
+        self.prefetcher = None
+
+        if not self.cache:
+            return
+
+        options = self.cache_options
+
+        if options['cache_max_bytes'] is not None:
+            self.memory_cache = MemoryCache(
+                max_bytes=options['cache_max_bytes'],
+                min_available=options['cache_min_available'],
+            )
+            read_files = self.memory_cache.wrap(self._read, namespace='files')
+            read = self.memory_cache.wrap(self.read, namespace='transforms')
+        else:
+            read_files = lru_cache(maxsize=options['read_cache_size'])(self._read)
+            read = lru_cache(maxsize=options['transform_cache_size'])(self.read)
+
+        if self.shared_cache is not None:
+            read_files = self.shared_cache.wrap(self._read, namespace='files')
+
+        self._read, self.read = read_files, read
+        self.cached_methods = {
+            'files': self._read,
+            'transforms': self.read,
+        }
+
+        if options['cache_stages']:
+            if self.memory_cache is not None:
+                self.stage_cache = self.memory_cache
+            else:
+                self.stage_cache = MemoryCache(
+                    max_bytes=None,
+                    max_entries=options['transform_cache_size'],
+                )
+
+        if options['prefetch']:
+            self.prefetcher = Prefetcher(
+                self.read,
+                window=options['prefetch'],
+                max_workers=options['prefetch_workers'],
+                is_valid=self._is_valid_num,
+            )
+            self.read = self.prefetcher
 
     def apply_correction(self, data, num, correction_name):
         """Apply specific correction (str) to data and return new data array"""
@@ -99,13 +240,183 @@ class DataSeriesReaderBase(ABC):
         Kwargs can be e.g. rotation=True or threshold=False to switch on/off
         transforms during the processing of the file
         """
+        if transform and self.stage_cache is not None:
+            return self._read_stages(num, correction=correction, **kwargs)
         data = self._read(num=num)
         data = self.apply_corrections(data, num, **kwargs) if correction else data
         data = self.apply_transforms(data, **kwargs) if transform else data
         return data
 
+    def read_many(
+        self,
+        nums,
+        correction=True,
+        transform=True,
+        max_workers=None,
+        **kwargs,
+    ):
+        """Read several data and apply corrections/transforms, as a stack.
+
+        Parameters
+        ----------
+        nums : iterable of int
+            data identifiers
+
+        correction, transform, **kwargs : see read()
+
+        max_workers : int, optional
+            number of threads used to read and process data; if None
+            (default), use default in ThreadPoolExecutor.
+
+        Returns
+        -------
+        np.ndarray
+            data stacked along first axis, in the order of nums.
+
+        Notes
+        -----
+        Transforms with stackable=True are applied on the whole stack at
+        once, the other ones on every data in parallel. Final results are
+        not stored in the transform cache.
+        """
+        nums = list(nums)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            data = self._read_many(nums, executor=executor)
+            if not nums:
+                return data
+
+            if correction:
+                names = [
+                    name for name in self.data_series.active_corrections
+                    if kwargs.get(name, True)
+                ]
+                if names:
+                    data = self._map_stack(
+                        lambda array, num: self.apply_corrections(array, num, **kwargs),
+                        data,
+                        nums,
+                        executor=executor,
+                    )
+
+            if transform:
+                for name in self.data_series.active_transforms:
+                    if not kwargs.get(name, True):
+                        continue
+                    if getattr(self.data_series, name).stackable:
+                        data = self.apply_transform(data, transform_name=name)
+                        continue
+                    data = self._map_stack(
+                        lambda array, _, name=name: self.apply_transform(array, name),
+                        data,
+                        nums,
+                        executor=executor,
+                    )
+        return data
+
+    @staticmethod
+    def _map_stack(function, data, nums, executor):
+        """Apply function(array, num) on every data of stack, into new stack"""
+        first = np.asarray(function(data[0], nums[0]))
+        out = np.empty((len(nums),) + first.shape, dtype=first.dtype)
+        out[0] = first
+
+        def process(i):
+            out[i] = function(data[i], nums[i])
+
+        for _ in executor.map(process, range(1, len(nums))):
+            pass
+        return out
+
+    def _is_valid_num(self, num):
+        """Whether data with identifier num exists (used for prefetching)"""
+        ntot = self.data_series.ntot
+        return num >= 0 and (ntot is None or num < ntot)
+
+    # ---------------------- Stage-wise transform cache ----------------------
+
+    def _stage_keys(self, num, correction, **kwargs):
+        """Cache keys of the results of every transform (stage) for num.
+
+        The key of a stage depends on the parameters of all corrections and
+        transforms applied up to this stage.
+        """
+        key = (num,)
+        if correction:
+            key += tuple(
+                (name, correction.state)
+                for name, correction in self.data_series.corrections.items()
+                if kwargs.get(name, True) and not correction.is_empty
+            )
+        stages = []
+        for name, transform in self.data_series.transforms.items():
+            active = kwargs.get(name, True) and not transform.is_empty
+            key += ((name, transform.state if active else None),)
+            stages.append((name, key, active))
+        return stages
+
+    def _read_stages(self, num, correction=True, **kwargs):
+        """Read and transform data, starting from the last cached stage."""
+        stages = self._stage_keys(num, correction=correction, **kwargs)
+
+        for start in reversed(range(len(stages))):
+            name, key, _ = stages[start]
+            data = self.stage_cache.get(('stages', name), key, _MISSING)
+            if data is not _MISSING:
+                stages = stages[start + 1:]
+                break
+        else:
+            data = self._read(num=num)
+            data = self.apply_corrections(data, num, **kwargs) if correction else data
+
+        for name, key, active in stages:
+            if active:  # inactive stages would just duplicate the previous one
+                data = self.apply_transform(data=data, transform_name=name)
+                self.stage_cache.put(('stages', name), key, data)
+        return data
+
+    def clear_stages(self, start=None):
+        """Clear cached results of transform named start and following ones.
+
+        If start is None, clear results of all transforms.
+        """
+        if self.stage_cache is None:
+            return
+        names = list(self.data_series.transforms)
+        if start is not None:
+            names = names[names.index(start):]
+        for name in names:
+            self.stage_cache.clear(('stages', name))
+
     # ============================= To subclass ==============================
 
+    def _read_many(self, nums, executor):
+        """How to read several files/data into a stack (see read_many()).
+
+        By default, data are read in parallel with _read() in threads of
+        executor and copied into a preallocated array. Redefine in subclasses
+        to e.g. decode files directly into the array.
+
+        Parameters
+        ----------
+        nums : list of int
+            data identifiers
+
+        executor : concurrent.futures.ThreadPoolExecutor
+
+        Returns
+        -------
+        np.ndarray
+            data stacked along first axis (shape (len(nums), ...))
+        """
+        if not nums:
+            return np.empty(0)
+        return self._map_stack(
+            lambda _, num: self._read(num=num),
+            data=[None] * len(nums),
+            nums=nums,
+            executor=executor,
+        )
+
     @abstractmethod
     def _read(self, num):
         """How to read file from series/stack. To be defined in subclasses.
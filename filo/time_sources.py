@@ -0,0 +1,215 @@
+"""Sources of timing information for files in file series."""
+
+# Standard library
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+# Non-standard
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+
+# Local imports
+from .fileio import load_json
+
+
+class TimeSourceBase(ABC):
+    """Base class to define how to get the times of files in a FileSeries.
+
+    Time sources work on many files at once (see get_times()), so that
+    subclasses can use vectorized or parallel methods.
+    """
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}()'
+
+    # ============================= To subclass ==============================
+
+    @abstractmethod
+    def get_times(self, filepaths):
+        """Get unix times of files.
+
+        Parameters
+        ----------
+        filepaths : list of str
+            paths of the files
+
+        Returns
+        -------
+        np.ndarray
+            array of unix times (float), NaN if time could not be determined.
+        """
+        pass
+
+
+class MetadataTimeSource(TimeSourceBase):
+    """Time read from each file or its metadata (e.g. image header, EXIF).
+
+    Files are read concurrently in a thread pool, so that reading times is
+    I/O bound.
+    """
+
+    def __init__(self, read_time=None, max_workers=None):
+        """Init time source.
+
+        Parameters
+        ----------
+        read_time : callable, optional
+            function that takes a file path (str) as input and returns a
+            unix time (float); if None, the read_time() method must be
+            defined in a subclass.
+
+        max_workers : int, optional
+            number of threads; if None (default), use default
+            in ThreadPoolExecutor.
+        """
+        if read_time is not None:
+            self.read_time = read_time
+        self.max_workers = max_workers
+
+    def get_times(self, filepaths):
+        """Get unix times of files by calling read_time() on every file.
+
+        Files for which read_time() fails (e.g. missing sidecar file) get
+        a NaN time.
+        """
+        if len(filepaths) < 2:  # avoid thread pool overhead
+            unix_times = map(self._try_read_time, filepaths)
+            return np.fromiter(unix_times, dtype=np.float64, count=len(filepaths))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            unix_times = executor.map(self._try_read_time, filepaths)
+            return np.fromiter(unix_times, dtype=np.float64, count=len(filepaths))
+
+    def _try_read_time(self, filepath):
+        try:
+            return float(self.read_time(filepath))
+        except Exception:
+            return np.nan
+
+    def read_time(self, filepath):
+        """Get unix time (float) of a single file (str)"""
+        raise NotImplementedError('Define read_time in subclass or at init.')
+
+
+class MtimeSource(MetadataTimeSource):
+    """Modification time (st_mtime) of files. Default in FileSeries."""
+
+    def __init__(self, max_workers=None):
+        """Init time source.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            number of threads; if None (default), use default
+            in ThreadPoolExecutor.
+        """
+        super().__init__(max_workers=max_workers)
+
+    def read_time(self, filepath):
+        return os.stat(filepath).st_mtime
+
+
+class SidecarTimeSource(MetadataTimeSource):
+    """Time stored in a sidecar file next to every file of the series.
+
+    The sidecar file has the same name as the file, with another extension
+    (e.g. 'img-001.json' for 'img-001.png'), and contains the unix time,
+    either as plain text or under a key of a JSON dictionary.
+    """
+
+    def __init__(self, extension='.json', key=None, max_workers=None):
+        """Init time source.
+
+        Parameters
+        ----------
+        extension : str
+            extension of the sidecar files, which replaces the extension of
+            the files of the series
+
+        key : str, optional
+            if None (default), sidecar files contain only the unix time as
+            text; if not None, sidecar files are JSON files in which the
+            unix time is stored under this key.
+
+        max_workers : int, optional
+            number of threads; if None (default), use default
+            in ThreadPoolExecutor.
+        """
+        super().__init__(max_workers=max_workers)
+        self.extension = extension
+        self.key = key
+
+    def __repr__(self):
+        name = self.__class__.__name__
+        return f"{name}(extension={self.extension!r}, key={self.key!r})"
+
+    def read_time(self, filepath):
+        sidecar = os.path.splitext(filepath)[0] + self.extension
+        if self.key is not None:
+            return load_json(sidecar)[self.key]
+        with open(sidecar, 'r', encoding='utf8') as f:
+            return float(f.read().strip())
+
+
+class FilenameTimeSource(TimeSourceBase):
+    """Time extracted from filenames with a regular expression.
+
+    Parsing is vectorized (done with pandas on all filenames at once).
+
+    Examples
+    --------
+    - files named e.g. 'img_1607500500.123.png' (unix time in name):
+    FilenameTimeSource(r'img_(\\d+\\.\\d+)')
+
+    - files named e.g. 'img_2024-01-12_15-25-03.png':
+    FilenameTimeSource(r'img_(.+)\\.png', fmt='%Y-%m-%d_%H-%M-%S')
+    """
+
+    def __init__(self, pattern, fmt=None, tz=None):
+        """Init time source.
+
+        Parameters
+        ----------
+        pattern : str
+            regular expression applied to filenames, the time information
+            being extracted from the first group (or from a group named 'time'
+            if it exists); files that do not match get a NaN time.
+
+        fmt : str, optional
+            if None (default), the extracted string is a unix time (in s);
+            else, datetime format of the extracted string, see
+            datetime.strptime() (e.g. '%Y%m%d-%H%M%S').
+
+        tz : str, optional
+            time zone used when fmt is not None (e.g. 'UTC'); if None
+            (default), times are considered to be in local time.
+        """
+        self.pattern = pattern
+        self.fmt = fmt
+        self.tz = tz
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({self.pattern!r}, fmt={self.fmt!r})"
+
+    def get_times(self, filepaths):
+        """Get unix times from the names of files."""
+        filenames = [os.path.basename(path) for path in filepaths]
+        filenames = pd.Series(filenames, dtype=object)
+        extracted = filenames.str.extract(self.pattern, expand=True)
+        column = 'time' if 'time' in extracted.columns else 0
+        values = extracted[column]
+
+        if self.fmt is None:
+            unix_times = pd.to_numeric(values, errors='coerce')
+            return unix_times.to_numpy(dtype=np.float64)
+
+        datetimes = pd.to_datetime(values, format=self.fmt, errors='coerce')
+        datetimes = datetimes.dt.tz_localize(
+            tzlocal() if self.tz is None else self.tz,
+            ambiguous='NaT',
+            nonexistent='NaT',
+        )
+        # Conversion to unix time (NaT converted to NaN)
+        unix_times = (datetimes - pd.Timestamp(0, tz='UTC')) / pd.Timedelta(seconds=1)
+        return unix_times.to_numpy(dtype=np.float64)
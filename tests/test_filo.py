@@ -1,10 +1,15 @@
 """Tests for filo module."""
 
+import os
+import time
+import pickle
 import filo
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from filo import FileSeries
 import pandas as pd
 import numpy as np
+import pytest
 
 MODULE_PATH = Path(filo.__file__).parent / '..'
 DATA_PATH = MODULE_PATH / 'data'
@@ -29,12 +34,285 @@ def test_series_numbering():
     assert FILES[-1].num == 19
 
 
+def test_series_auto_files():
+    """Check automatic detection gives ordered files with their mtimes."""
+    files = FileSeries.auto(folders=FOLDERS, extension='.png')
+    paths = [p for folder in FOLDERS for p in sorted(folder.glob('*.png'))]
+    assert [file.path for file in files] == paths
+    assert files[5].unix_time == paths[5].stat().st_mtime
+
+
+def test_series_lazy_times():
+    """Check that deferred times are resolved in bulk when needed."""
+    files = FileSeries.auto(folders=FOLDERS, extension='.png', lazy_times=True)
+    assert np.isnan(files._times).all()
+    assert files[3].unix_time == files[3].path.stat().st_mtime
+    assert np.isnan(files._times).sum() == 19
+    info = files.info
+    assert not np.isnan(files._times).any()
+    assert info.at[12, 'time (unix)'] == files[12].path.stat().st_mtime
+
+
+def test_series_refresh(tmp_path):
+    """Check that files added to series folders are detected."""
+    for i in range(3):
+        (tmp_path / f'img-{i:03d}.png').touch()
+    files = FileSeries.auto(folders=tmp_path, extension='.png')
+    assert files.refresh() == []
+    for i in range(3, 5):
+        (tmp_path / f'img-{i:03d}.png').touch()
+    (tmp_path / 'other.txt').touch()
+    new_files = files.refresh()
+    assert [file.num for file in new_files] == [3, 4]
+    assert files[-1].name == 'img-004.png'
+    (tmp_path / 'img-005.png').touch()
+    new_files = next(files.follow(interval=0.01, timeout=1))
+    assert len(files) == 6
+    assert new_files[0].num == 5
+
+
+def test_series_refresh_coarse_mtime(tmp_path):
+    """Check files added without changing folder mtime just after a scan."""
+    (tmp_path / 'img-000.png').touch()
+    mtime = time.time_ns()
+    os.utime(tmp_path, ns=(mtime, mtime))
+    files = FileSeries.auto(folders=tmp_path, extension='.png')
+    (tmp_path / 'img-001.png').touch()
+    os.utime(tmp_path, ns=(mtime, mtime))  # e.g. same tick on a NAS
+    assert [file.name for file in files.refresh()] == ['img-001.png']
+
+
+def test_series_missing_folder(tmp_path):
+    """Check that missing folders give empty series, filled by refresh()."""
+    folder = tmp_path / 'missing'
+    files = FileSeries.auto(folders=folder, extension='.png')
+    tree = FileSeries.auto(folders=folder, extension='.png', recursive=True)
+    assert len(files) == len(tree) == 0
+    (folder / 'sub').mkdir(parents=True)
+    (folder / 'img-000.png').touch()
+    (folder / 'sub' / 'img-001.png').touch()
+    assert len(files.refresh()) == 1
+    assert len(tree.refresh()) == 2
+
+
+def test_series_refresh_from_csv(tmp_path):
+    """Check that refresh() of series from csv only considers their extension."""
+    for i in range(3):
+        (tmp_path / f'img-{i:03d}.png').touch()
+    series = FileSeries.auto(folders=tmp_path, extension='.png', refpath=tmp_path)
+    series.to_csv(tmp_path / 'info.tsv')
+    files = FileSeries.from_csv(tmp_path / 'info.tsv', refpath=tmp_path)
+    (tmp_path / 'img-003.png').touch()
+    (tmp_path / 'notes.txt').touch()
+    assert [file.name for file in files.refresh()] == ['img-003.png']
+    with pytest.raises(ValueError):
+        FileSeries(files=()).refresh()
+
+
+def test_series_recursive(tmp_path):
+    """Test detection of files in subfolders, with several extensions."""
+    for folder in 'day2/h1', 'day1/h2', 'day1/h1', 'day1/skip':
+        (tmp_path / folder).mkdir(parents=True)
+        for name in 'b.png', 'a.tif', 'c.txt':
+            (tmp_path / folder / name).touch()
+    (tmp_path / 'day1' / 'z.png').touch()
+    files = FileSeries.auto(
+        folders=tmp_path,
+        extension=('.png', '.tif'),
+        refpath=tmp_path,
+        recursive=True,
+        exclude='*/skip',
+        max_workers=3,
+    )
+    info = files.info
+    assert len(files) == 7
+    assert list(info['folder'][:5]) == ['day1', 'day1/h1', 'day1/h1', 'day1/h2', 'day1/h2']
+    assert list(info['filename'][:3]) == ['z.png', 'a.tif', 'b.png']
+    assert files[-1].path == tmp_path / 'day2' / 'h1' / 'b.png'
+
+
+def test_series_refresh_recursive(tmp_path):
+    """Test that refresh() finds new files in new and existing subfolders."""
+    (tmp_path / 'day1' / 'h1').mkdir(parents=True)
+    (tmp_path / 'day1' / 'empty').mkdir()
+    (tmp_path / 'day1' / 'h1' / 'a.png').touch()
+    files = FileSeries.auto(folders=tmp_path, extension='.png', recursive=True)
+    assert files.refresh() == []
+
+    time.sleep(0.01)  # new modification times of folders
+    (tmp_path / 'day1' / 'h1' / 'b.png').touch()
+    (tmp_path / 'day1' / 'empty' / 'c.png').touch()
+    (tmp_path / 'day2' / 'h1').mkdir(parents=True)
+    (tmp_path / 'day2' / 'h1' / 'd.png').touch()
+    new_files = files.refresh()
+    assert [file.name for file in new_files] == ['c.png', 'b.png', 'd.png']  # by folder
+    assert [file.num for file in new_files] == [1, 2, 3]
+    assert files.refresh() == []
+
+
+def test_series_manifest(tmp_path):
+    """Check that detected files are cached in manifest and reused."""
+    folder = tmp_path / 'img'
+    folder.mkdir()
+    for i in range(3):
+        (folder / f'img-{i:03d}.png').touch()
+    os.utime(folder, (0, 0))  # not modified just before scan
+    manifest = tmp_path / 'manifest.json'
+    files = FileSeries.auto(folders=folder, extension='.png', manifest=manifest)
+    data = filo.load_json(manifest)
+    assert data['img']['names'] == [file.name for file in files]
+
+    # Folder not modified: names taken from manifest
+    data['img']['names'][0] = 'cached.png'
+    filo.to_json(data, manifest)
+    files = FileSeries.auto(folders=folder, extension='.png', manifest=manifest)
+    assert files[0].name == 'cached.png'
+
+    # Folder modified: folder scanned again
+    (folder / 'img-003.png').touch()
+    files = FileSeries.auto(folders=folder, extension='.png', manifest=manifest)
+    assert files[0].name == 'img-000.png'
+    assert len(files) == 4
+
+
+def test_series_manifest_other_folder(tmp_path, monkeypatch):
+    """Check folder paths of manifest not in the working directory."""
+    monkeypatch.chdir(tmp_path)
+    folder = Path('data/img')
+    folder.mkdir(parents=True)
+    (folder / 'img-000.png').touch()
+    os.utime(folder, (0, 0))
+    FileSeries.auto(folders=folder, refpath='data', extension='.png', manifest=True)
+    data = filo.load_json(Path('data') / FileSeries.MANIFEST_FILENAME)
+    assert list(data) == ['img']
+
+    data['img']['names'] = ['cached.png']
+    filo.to_json(data, Path('data') / FileSeries.MANIFEST_FILENAME)
+    files = FileSeries.auto(folders=folder, refpath='data', extension='.png', manifest=True)
+    assert files[0].name == 'cached.png'
+
+
+def test_series_manifest_time_source(tmp_path):
+    """Check that times cached in manifest are only used for mtimes."""
+    for i in 1, 2, 3:
+        (tmp_path / f'img-{i}00.png').touch()
+    os.utime(tmp_path, (0, 0))
+    manifest = tmp_path / 'manifest.json'
+    FileSeries.auto(folders=tmp_path, extension='.png', manifest=manifest)
+    files = FileSeries.auto(
+        folders=tmp_path,
+        extension='.png',
+        manifest=manifest,
+        time_source=filo.FilenameTimeSource(r'img-(\d+)'),
+    )
+    assert list(files.info['time (unix)']) == [100, 200, 300]
+
+
+def test_series_changes(tmp_path):
+    """Test detection of changed files with fingerprints."""
+    for i in range(4):
+        (tmp_path / f'img-{i}.png').write_bytes(bytes([i]))
+    files = FileSeries.auto(folders=tmp_path, extension='.png')
+    manifest = tmp_path / 'fingerprints.tsv'
+    files.save_fingerprints(manifest, content=True)
+    assert len(files.changed_since(manifest)) == 0
+
+    os.utime(tmp_path / 'img-1.png', ns=(0, 0))  # same contents, new mtime
+    (tmp_path / 'img-2.png').write_bytes(b'new')
+    assert list(files.changed_since(manifest)) == [2]
+    assert list(files.changed_since(files[:2].fingerprints())) == [2, 3]
+
+
+def test_series_slicing():
+    """Check that files are correctly generated from series columns."""
+    files = FILES[2:5]
+    assert [file.num for file in files] == [2, 3, 4]
+    assert files[0].path == FOLDERS[0] / 'img-00612.png'
+    assert FILES[-2].folder == FOLDERS[1]
+    assert len(FILES) == 20
+
+
+def test_series_views_write():
+    """Check that times set in any sub-series are set in the full series."""
+    files = FileSeries.auto(folders=FOLDERS, extension='.png', refpath=DATA_PATH)
+    odd = files[files.info.index % 2 == 1]
+    odd.update_times(TIME_INFO)
+    assert files.info.at[3, 'time (unix)'] == 1607500506
+    assert files.info.at[2, 'time (unix)'] != 1607500504
+    odd[1:][0].unix_time = 123  # num 3
+    assert files.info.at[3, 'time (unix)'] == 123
+    files[10:].between(1607500522, 1607500522)[0].unix_time = 456  # num 11
+    assert files[11].unix_time == 456
+
+    source = filo.FilenameTimeSource(r'img-(\d+)')
+    files[::2].set_times(time_source=source)
+    assert files[4].unix_time == 614
+    assert files[5].unix_time != 615
+
+
+def test_series_set_file_time():
+    """Check that setting the time of a file of a series updates the series."""
+    files = FileSeries.auto(folders=FOLDERS, extension='.png', refpath=DATA_PATH)
+    files.info  # cached
+    files[3].unix_time = 123
+    assert files[3].unix_time == 123
+    assert files.info.at[3, 'time (unix)'] == 123
+
+
+def test_series_views():
+    """Check that sub-series share data with their parent series."""
+    files = FileSeries.auto(folders=FOLDERS, extension='.png', refpath=DATA_PATH)
+    view = files[10:15]
+    assert isinstance(view, FileSeries)
+    assert np.shares_memory(view._times, files._times)
+    assert list(view.info.index) == [10, 11, 12, 13, 14]
+    assert list(view.info['folder']) == ['img1'] + ['img2'] * 4
+
+    view.update_times(TIME_INFO)  # only nums of the view are updated
+    assert files.info.at[12, 'time (unix)'] == 1607500524
+    assert files.info.at[2, 'time (unix)'] != 1607500504
+    assert round(view.duration.total_seconds()) == 8
+
+    odd = files[files.info.index % 2 == 1]
+    assert [file.num for file in odd[:3]] == [1, 3, 5]
+    img2 = files.filter(lambda file: file.folder.name == 'img2')
+    assert len(img2) == 9
+    assert [file.num for file in files[[0, -1]]] == [0, 19]
+
+
+def test_series_views_refresh():
+    """Check that views cannot be refreshed (files would be duplicated)."""
+    view = FILES[:5]
+    with pytest.raises(ValueError):
+        view.refresh()
+    with pytest.raises(ValueError):
+        next(view.follow(timeout=0))
+    assert len(FILES.folders) == 2
+
+
+def test_series_by_folder():
+    """Check grouping of files by folder."""
+    groups = FILES.by_folder()
+    assert list(groups) == list(FOLDERS)
+    img2 = groups[FOLDERS[1]]
+    assert img2[0].num == 11
+    assert len(img2) == 9
+    assert np.shares_memory(img2._names, FILES._names)
+
+
 def test_series_info():
     """test generation of infos DataFrame."""
     files = FileSeries.from_csv(FILE_INFO, sep='\t', refpath=DATA_PATH)
     assert round(files.info.at[4, 'time (unix)']) == 1599832405
 
 
+def test_series_from_csv():
+    """Test files and folders of series loaded from csv file."""
+    files = FileSeries.from_csv(FILE_INFO, sep='\t', refpath=DATA_PATH)
+    assert files[12].name.strip() == 'img-00626.png'
+    assert files.folders == [DATA_PATH / 'img']
+
+
 def test_series_info_update_time():
     """Test loading file data from external file."""
     FILES.update_times(TIME_INFO)
@@ -42,12 +320,447 @@ def test_series_info_update_time():
     assert info.at[2, 'time (unix)'] == 1607500504
 
 
+def test_series_info_cache():
+    """Check that info is cached and re-calculated when times change."""
+    files = FileSeries.auto(folders=FOLDERS, refpath=DATA_PATH, extension='.png')
+    info = files.info
+    assert files.info is info
+    assert info.at[13, 'folder'] == 'img2'
+    files.update_times(TIME_INFO)
+    assert files.info is not info
+    assert files.info.at[2, 'time (unix)'] == 1607500504
+
+
+def test_series_time_lookup():
+    """Test finding files from their times."""
+    files = FileSeries.auto(folders=FOLDERS, extension='.png')
+    files.update_times(TIME_INFO)
+    assert files.nearest(1607500504.9).num == 2
+    assert files.nearest(1607500505.1).num == 3
+    assert files.nearest(0).num == 0
+    nums = files.nearest_many([1607500501, 1607500537, 1607600000])
+    assert list(nums) == [0, 18, 19]
+    assert [file.num for file in files.between(1607500503, 1607500508)] == [2, 3, 4]
+
+
+def test_series_time_lookup_unknown():
+    """Check that files with unknown times (NaN) are ignored in lookups."""
+    files = FileSeries([
+        filo.File(f'missing-{t}.png', num=i, unix_time=t)
+        for i, t in enumerate([1, 2, np.nan])
+    ])
+    assert files.nearest(5).num == 1
+    assert [file.num for file in files.between(0, np.inf)] == [0, 1]
+    with pytest.raises(ValueError):
+        files[2:].nearest(5)
+
+
+def test_series_npz(tmp_path):
+    """Test saving / loading file info to / from binary file."""
+    filepath = tmp_path / 'File_Info.npz'
+    FILES.to_npz(filepath)
+    files = FileSeries.from_npz(filepath, refpath=DATA_PATH)
+    pd.testing.assert_frame_equal(files.info, FILES.info)
+    assert isinstance(files._times.base, np.memmap)
+    assert files[15].path == FILES[15].path
+
+
+def test_series_time_sources(tmp_path):
+    """Test getting file times from filenames and sidecar files."""
+    source = filo.FilenameTimeSource(r'img-(\d+)')
+    files = FileSeries.auto(folders=FOLDERS, extension='.png', time_source=source)
+    assert files[12].unix_time == 626
+    files.set_times(filo.MtimeSource())
+    assert files[12].unix_time == files[12].path.stat().st_mtime
+
+    for name in '2024-01-12_15-25-03', '2024-01-12_15-25-04':
+        (tmp_path / f'{name}.png').touch()
+        filo.to_json({'t': 1000}, tmp_path / f'{name}.json')
+    source = filo.FilenameTimeSource(r'(.+)\.png', fmt='%Y-%m-%d_%H-%M-%S', tz='UTC')
+    files = FileSeries.auto(folders=tmp_path, extension='.png', time_source=source)
+    assert list(files.info['time (unix)']) == [1705073103, 1705073104]
+    files.set_times(filo.SidecarTimeSource(extension='.json', key='t'))
+    assert files.duration.total_seconds() == 0
+
+
+def test_series_time_sources_missing(tmp_path):
+    """Files whose time cannot be determined get NaN, and are not retried."""
+    for name in 'img-100.png', 'img-200.png', 'other.png':
+        (tmp_path / name).touch()
+    (tmp_path / 'img-100.txt').write_text('1000')
+    sidecar = filo.SidecarTimeSource(extension='.txt')
+    files = FileSeries.auto(folders=tmp_path, extension='.png', time_source=sidecar)
+    assert files[0].unix_time == 1000 and np.isnan(files[1].unix_time)
+
+    source = filo.FilenameTimeSource(r'img-(\d+)')
+    files = FileSeries.auto(folders=tmp_path, extension='.png', time_source=source)
+    info = files.info
+    assert np.isnan(files[2].unix_time)
+    assert files.info is info
+
+
+def test_catalog(tmp_path):
+    """Test storing and querying file series in SQLite catalog."""
+    files = FileSeries.auto(folders=FOLDERS, extension='.png')
+    files.update_times(TIME_INFO)
+    with filo.FileCatalog(tmp_path / 'Catalog.db', refpath=DATA_PATH) as catalog:
+        catalog.add(files, name='run1')
+        catalog.discover(name='run2', folders=FOLDERS[1], extension='.png')
+        assert len(catalog) == 29
+        assert catalog.names == ['run1', 'run2']
+        subset = catalog.between(1607500503, 1607500508, name='run1')
+        assert list(subset.info.index) == [2, 3, 4]
+        assert subset[1].path == FILES[3].path
+        assert catalog.nearest(1607500524.9, name='run1').num == 12
+        img2 = catalog.to_series(name='run1', folder='img2')
+        assert len(img2) == 9
+        assert list(img2.info['time (unix)']) == list(files[11:].info['time (unix)'])
+        assert len(catalog.to_series(name='run1', folder='./img2/')) == 9
+
+
 def test_series_duration():
     """Test calculation of time duration of files."""
     FILES.update_times(TIME_INFO)
     assert round(FILES.duration.total_seconds()) == 38
 
 
+# ------------------------------ File management -----------------------------
+
+
+def test_iter_files(tmp_path):
+    """Test streamed, multi-extension and naturally sorted file listing."""
+    for name in 'img-10.png', 'img-9.tif', 'img-100.png', 'img-1.txt':
+        (tmp_path / name).touch()
+    files = filo.iter_files(tmp_path, extension=('.png', '.tif'), sort='natural')
+    assert [file.name for file in files] == ['img-9.tif', 'img-10.png', 'img-100.png']
+    files = filo.iter_files(tmp_path, pattern='img-1*', sort='name')
+    assert [file.name for file in files] == ['img-1.txt', 'img-10.png', 'img-100.png']
+    assert len(list(filo.iter_files(tmp_path))) == 4
+
+
+def test_list_missing_folder(tmp_path):
+    """Test that listing files of a missing folder returns nothing."""
+    assert filo.list_files(tmp_path / 'missing') == []
+    assert filo.scan_tree(tmp_path / 'missing') == {}
+
+
+def test_move_files(tmp_path):
+    """Test bulk moves with dry run, journal, resume and rollback."""
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    src.mkdir()
+    for i in range(5):
+        (src / f'{i}.txt').touch()
+    (src / 'other.dat').touch()
+
+    plan = filo.move_files(src, dst, extension='.txt', dry_run=True)
+    assert len(plan) == 5
+    assert not dst.exists()
+
+    journal = tmp_path / 'journal.txt'
+    dst.mkdir()
+    filo.bulk_move(plan[:2], journal=journal)  # e.g. interrupted
+    moves = filo.move_files(src, dst, extension='.txt', journal=journal, max_workers=2)
+    assert len(moves) == 3
+    assert filo.list_files(src) == [src / 'other.dat']
+    assert len(filo.list_files(dst)) == 5
+
+    filo.undo_moves(journal)
+    assert len(filo.list_files(src)) == 6
+    assert not journal.exists()
+
+    filo.batch_file_rename('3.txt', 'three.txt', path=tmp_path)
+    assert (src / 'three.txt').exists()
+
+
+# ---------------------------------- File IO ---------------------------------
+
+
+def test_iter_csv():
+    """Test chunked / whole-file typed loading of csv data."""
+    chunks = list(filo.iter_csv(pressure_file, sep='\t', skiprows=1, chunksize=40))
+    data = filo.load_csv_array(pressure_file, sep='\t', skiprows=1)
+    assert np.array_equal(np.concatenate(chunks), data)
+    assert [len(chunk) for chunk in chunks] == [40, 40, 19]
+    assert data.shape == PRESSURE_DATA.reset_index().shape
+
+    dtype = (int, str, str, float)
+    chunk = next(filo.iter_csv(FILE_INFO, sep='\t', skiprows=1, dtype=dtype))
+    assert chunk['f0'][4] == 4
+    assert chunk['f2'][4] == 'img-00614.png'
+    assert chunk['f3'][4] == 1599832405
+
+
+def test_iter_csv_no_comments(tmp_path):
+    """Check that '#' in fields is not considered as a comment."""
+    filepath = tmp_path / 'files.csv'
+    filepath.write_text('num,filename\n2,img#1.png\n')
+    data, = filo.iter_csv(filepath, skiprows=1, dtype=(int, str))
+    assert data['f1'][0] == filo.load_csv(filepath, skiprows=1)[0][1] == 'img#1.png'
+
+
+def test_tabular_writer(tmp_path):
+    """Test buffered writer gives same output as data_to_line."""
+    rows = np.random.default_rng(0).normal(size=(25, 3))
+    rows[3, 1] = np.nan
+    filepath = tmp_path / 'data.tsv'
+    with filo.TabularWriter(filepath, header=('a', 'b', 'c'), buffer_size=10) as writer:
+        writer.write_rows(rows[:20])
+        for row in rows[20:]:
+            writer.write_row(row)
+        assert filepath.read_text().count('\n') == 21  # header + 20 rows
+    expected = filo.data_to_line(('a', 'b', 'c'))
+    expected += ''.join(filo.data_to_line(row) for row in rows)
+    assert filepath.read_text() == expected
+    assert writer.closed
+
+
+def test_line_index(tmp_path):
+    """Test random access to rows of csv file with persisted line index."""
+    filepath = tmp_path / 'data.tsv'
+    data = np.column_stack((np.arange(100) + 0.5, np.arange(100) ** 2))
+    with filo.TabularWriter(filepath, header=('t', 'x')) as writer:
+        writer.write_rows(data[:90])
+
+    with filo.LineIndex(filepath, sep='\t', skiprows=1, time_column=0) as index:
+        assert len(index) == 90
+        assert np.array_equal(index.read(10, 20), data[10:20])
+        assert index.locate(10, 20) == (10, 20)
+        assert np.array_equal(index.between(t1=2), data[:2])
+    assert os.path.exists(str(filepath) + '.index.npz')
+
+    # Index rebuilt when file changes
+    with filo.TabularWriter(filepath) as writer:
+        writer.write_rows(data[90:])
+    with filo.LineIndex(filepath, sep='\t', skiprows=1, time_column=0) as index:
+        assert len(index) == 100
+        assert np.array_equal(index.read(-3, None), data[-3:])
+
+
+def test_line_index_separators(tmp_path):
+    """Check that only newlines delimit rows in line index."""
+    filepath = tmp_path / 'data.tsv'
+    filepath.write_bytes(b'0\ta\x0cb\r\n1\t#c\r\n2\td')
+    with filo.LineIndex(filepath, sep='\t', time_column=0) as index:
+        assert len(index) == 3
+        assert index.lines(0, 3) == ['0\ta\x0cb', '1\t#c', '2\td']
+        assert index.locate(1, 2) == (1, 3)
+
+
+# ------------------------------ Data series ---------------------------------
+
+
+class ArrayReader(filo.DataSeriesReaderBase):
+
+    def _read(self, num):
+        return np.full(1000, num, dtype=np.float64)  # 8 kB
+
+
+class Offset(filo.TransformParameterBase):
+    """Transform adding data['value'] and counting calls to apply()"""
+    name = 'offset'
+    ncalls = 0
+
+    def apply(self, data):
+        self.ncalls += 1
+        return data + self.data['value']
+
+    def set(self, value):
+        self.data = {'value': value}
+        self._update_others()
+
+
+class Scale(Offset):
+    """Transform multiplying by data['value']"""
+    name = 'scale'
+    stackable = True
+
+    def apply(self, data):
+        self.ncalls += 1
+        return data * self.data['value']
+
+
+class ArraySeries(filo.DataSeries):
+
+    def __init__(self, **reader_kwargs):
+        super().__init__(reader=None)
+        for transform in Offset(self), Scale(self):
+            self.transforms[transform.name] = transform
+            setattr(self, transform.name, transform)
+        self.reader = ArrayReader(self, **reader_kwargs)
+
+    @property
+    def nums(self):
+        return range(10)
+
+    @property
+    def ntot(self):
+        return 10
+
+
+def test_reader_memory_cache():
+    """Test cache limited in bytes, with LRU eviction."""
+    series = ArraySeries(cache=True, cache_max_bytes='40kB')
+    for num in range(3):
+        series.read(num)
+    info = series.cache_info()
+    # read(0) stores _read(0) first, which is thus evicted first
+    assert info['files'].currsize == 2 and info['transforms'].currsize == 3
+    assert series.reader.memory_cache.nbytes == 40000
+    series.read(2)
+    assert series.cache_info()['transforms'].hits == 1
+    series.clear_cache('transforms')
+    assert series.cache_info()['transforms'].currsize == 0
+    assert series.cache_info()['files'].currsize == 2
+
+
+def test_memory_cache_too_large():
+    """Test that values larger than the cache do not evict other entries."""
+    cache = filo.MemoryCache(max_bytes='40kB')
+    for num in range(4):
+        cache.put('files', num, np.zeros(1000))  # 8 kB
+    cache.put('files', 4, np.zeros(10000))  # 80 kB
+    assert len(cache) == 4 and cache.nbytes == 32000
+    assert cache.get('files', 4) is None
+
+
+def test_reader_stage_cache():
+    """Test that only modified transforms and the next ones are recalculated."""
+    series = ArraySeries(cache=True, cache_stages=True)
+    series.offset.set(1)
+    series.scale.set(2)
+    assert series.read(3)[0] == 8
+    series.scale.set(3)
+    assert series.read(3)[0] == 12
+    assert (series.offset.ncalls, series.scale.ncalls) == (1, 2)
+    series.offset.set(2)
+    assert series.read(3)[0] == 15
+    assert (series.offset.ncalls, series.scale.ncalls) == (2, 3)
+    # Modifying scale keeps cached results of offset
+    series.scale.set(2)
+    assert series.read(3, scale=False)[0] == 5
+    assert (series.offset.ncalls, series.scale.ncalls) == (2, 3)
+
+
+def test_reader_prefetch():
+    """Test that data is read in advance when accessed regularly."""
+    series = ArraySeries(cache=True, prefetch=3)
+    for num in (9, 7, 5):
+        series.read(num)
+    series.reader.prefetcher.wait()
+    assert series.cache_info()['transforms'].currsize == 5  # 3, 1 (-1 invalid)
+    for num in (3, 1):
+        assert series.read(num)[0] == num
+    assert series.cache_info()['transforms'].hits == 2
+    series.reader.prefetcher.shutdown()
+
+
+def test_reader_prefetch_long_pass():
+    """Check that prefetch state does not grow during a regular pass."""
+    series = ArraySeries(cache=True, prefetch=2)
+    for num in range(10):
+        series.read(num)
+        assert len(series.reader.prefetcher._scheduled) <= 2
+    series.reader.prefetcher.shutdown()
+
+
+class SlowOffset(Offset):
+
+    def apply(self, data):
+        data = super().apply(data)
+        time.sleep(0.05)
+        return data
+
+
+def test_reader_prefetch_clear():
+    """Check that data prefetched with old transforms is not kept."""
+    series = ArraySeries(cache=True, prefetch=2)
+    series.offset = series.transforms['offset'] = SlowOffset(series)
+    series.offset.set(0)
+    for num in range(4):
+        series.read(num)
+    time.sleep(0.02)  # prefetch of 5 in progress
+    series.offset.set(100)
+    assert series.read(5)[0] == 105
+    series.reader.prefetcher.shutdown()
+
+
+def test_transform_state_arrays():
+    """Check that transform states differ for large arrays differing little."""
+    series = ArraySeries()
+    values = np.zeros(2000)
+    series.offset.set(values)
+    state = series.offset.state
+    values = values.copy()
+    values[1000] = 1  # not in repr(), which is truncated
+    series.offset.set(values)
+    assert series.offset.state != state
+    series.offset.set(np.zeros(2000))
+    assert series.offset.state == state
+
+
+def test_read_many():
+    """Test reading stacks of data, with transforms."""
+    series = ArraySeries()
+    series.offset.set(1)
+    series.scale.set(2)
+    stack = series.read_many([4, 2, 7], max_workers=2)
+    assert stack.shape == (3, 1000)
+    assert np.array_equal(stack[:, 0], [10, 6, 16])
+    assert series.scale.ncalls == 1  # applied on whole stack
+    stack = series.read_many(range(3), offset=False)
+    arrays = [series.read(num, offset=False) for num in range(3)]
+    assert np.array_equal(stack, np.stack(arrays))
+
+
+def read_in_worker(series):
+    """Read data in other process, return stats of files cache"""
+    assert series.read(1)[0] == 1
+    assert not series.read(5).flags.writeable  # view of shared memory
+    info = series.cache_info()['files']
+    return info.hits, info.misses
+
+
+def test_reader_shared_cache():
+    """Test that files cache is shared between processes."""
+    unpickled = pickle.loads(pickle.dumps(ArraySeries(cache=True)))
+    assert unpickled.read(2)[0] == 2
+
+    series = ArraySeries(cache=True, cache_shared=True)
+    try:
+        series.read(5)
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            hits, misses = executor.submit(read_in_worker, series).result()
+        assert (hits, misses) == (1, 1)
+        assert len(series.reader.shared_cache) == 2
+        series.clear_cache('files')
+        assert len(series.reader.shared_cache) == 0
+    finally:
+        series.reader.shared_cache.close()
+
+
+def read_evicting_in_worker(series):
+    """Read more data than the shared cache holds in other process,
+    return maximum number of shared memory blocks attached by the process"""
+    nattached = 0
+    for num in list(range(10)) * 3:
+        assert series.reader._read(num)[0] == num
+        nattached = max(nattached, len(filo.cache._ATTACHED))
+    return nattached
+
+
+def test_reader_shared_cache_eviction():
+    """Test that workers do not keep blocks evicted by other processes."""
+    series = ArraySeries(cache=True, cache_shared=True, read_cache_size=3)
+    try:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            futures = [executor.submit(read_evicting_in_worker, series) for _ in range(2)]
+            nattached = [future.result() for future in futures]
+        assert max(nattached) <= 6
+        assert len(series.reader.shared_cache) == 3
+    finally:
+        series.reader.shared_cache.close()
+
+
 # -------------------------------- Resampling --------------------------------
 
 